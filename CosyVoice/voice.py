@@ -23,8 +23,9 @@ import subprocess
 import tempfile
 import hashlib
 import shutil
-import glob
 import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -34,13 +35,25 @@ sys.path.append(str(SCRIPT_DIR / 'third_party/Matcha-TTS'))
 
 # ============ SETTINGS ============
 VOICES_CACHE_DIR = SCRIPT_DIR / "voices"
+VOCALS_CACHE_DIR = SCRIPT_DIR / "voices" / "vocals"
+MAX_VOCALS_CACHE = 50  # isolated vocal tracks kept on disk
+DEMUCS_MODEL = "htdemucs"
 OUTPUT_DIR = SCRIPT_DIR / "output"
 MODEL_PATH = SCRIPT_DIR / "pretrained_models/CosyVoice2-0.5B"
 MAX_VOICE_DURATION = 15  # seconds
 MAX_YOUTUBE_DURATION = 30  # seconds
 BOTBIN_UPLOAD_URL = "https://botbin.net/upload"
+OPUS_BITRATE = "32k"  # plenty for speech, ~3x smaller than MP3 q2
+MAX_DOWNLOAD_SIZE = 50 * 1024 * 1024  # 50 MB
+ALLOWED_DOWNLOAD_TYPES = ("audio/", "video/", "application/octet-stream", "application/ogg")
+CONNECT_TIMEOUT = 5  # seconds, fail fast on unreachable hosts
 # ==================================
 
+# Shared HTTP session so connections (and their resolved hosts) are pooled
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+HTTP_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
 
 def parse_time(t: str) -> float:
     """Parse time string to seconds. Supports ss, mm:ss, or hh:mm:ss."""
@@ -55,6 +68,16 @@ def parse_time(t: str) -> float:
     raise ValueError(f"Invalid time format: {t}")
 
 
+def validate_url(url: str) -> str:
+    """Return an error message if URL is not a fetchable http(s) URL, else ''."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https"):
+        return "URL must start with http:// or https://"
+    if not parsed.netloc:
+        return "Invalid URL: no host found"
+    return ""
+
+
 def format_time(sec: float) -> str:
     """Format seconds to hh:mm:ss.mmm"""
     h = int(sec // 3600)
@@ -97,15 +120,50 @@ def transcribe_audio(audio_path: Path) -> str:
     return transcript
 
 
+def probe_download(url: str) -> str:
+    """HEAD the URL and return an error if it is clearly too large or not audio, else ''."""
+    try:
+        head = HTTP_SESSION.head(url, timeout=CONNECT_TIMEOUT, allow_redirects=True)
+    except requests.RequestException:
+        return ""  # let the GET report the real error
+    if head.status_code >= 400:
+        return ""  # some hosts don't support HEAD
+    
+    length = int(head.headers.get("Content-Length") or 0)
+    if length > MAX_DOWNLOAD_SIZE:
+        return f"file too large ({length} bytes)"
+    
+    content_type = head.headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+    if content_type and not content_type.startswith(ALLOWED_DOWNLOAD_TYPES):
+        return f"not an audio file ({content_type})"
+    return ""
+
+
 def download_file(url: str, dest: Path, timeout: int = 30) -> bool:
     """Download file from URL."""
     print(f"[VOICE] Downloading: {url}")
+    error = probe_download(url)
+    if error:
+        print(f"[VOICE] Download failed: {error}")
+        return False
     try:
-        response = requests.get(url, timeout=timeout, stream=True)
+        response = HTTP_SESSION.get(url, timeout=(CONNECT_TIMEOUT, timeout), stream=True)
         response.raise_for_status()
+        
+        length = int(response.headers.get("Content-Length") or 0)
+        if length > MAX_DOWNLOAD_SIZE:
+            print(f"[VOICE] Download failed: file too large ({length} bytes)")
+            return False
+        
+        # Copy in C with 1 MB buffers instead of iterating chunks in Python
+        response.raw.decode_content = True
         with open(dest, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+            shutil.copyfileobj(response.raw, f, 1 << 20)
+        
+        if dest.stat().st_size > MAX_DOWNLOAD_SIZE:
+            dest.unlink()
+            print("[VOICE] Download failed: file too large")
+            return False
         return True
     except Exception as e:
         print(f"[VOICE] Download failed: {e}")
@@ -113,44 +171,50 @@ def download_file(url: str, dest: Path, timeout: int = 30) -> bool:
 
 
 def download_youtube_clip(url: str, start: str, end: str, output_dir: Path) -> Path:
-    """Download YouTube video and extract audio clip."""
+    """Download only the requested section of a YouTube video as an MP3 clip."""
     print(f"[VOICE] Downloading YouTube clip ({start} - {end})...")
     
-    with tempfile.TemporaryDirectory() as tmp:
-        tmp_path = Path(tmp)
-        
-        # Download video
-        out_template = str(tmp_path / "%(title)s.%(ext)s")
-        cmd = ["yt-dlp", "-f", "bv*+ba/b", "--merge-output-format", "mp4", "-o", out_template, url]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            error_msg = result.stderr.strip() or result.stdout.strip() or "Unknown yt-dlp error"
-            raise RuntimeError(f"yt-dlp failed: {error_msg}")
-        
-        # Find downloaded file
-        mp4_files = list(tmp_path.glob("*.mp4"))
-        if not mp4_files:
-            raise RuntimeError("yt-dlp did not produce an MP4 file")
-        video_path = mp4_files[0]
-        
-        # Extract audio clip
-        start_fmt = format_time(parse_time(start))
-        end_fmt = format_time(parse_time(end))
-        output_path = output_dir / f"yt_clip_{get_file_hash(video_path)}.mp3"
-        
-        cmd = [
-            "ffmpeg", "-y", "-ss", start_fmt, "-to", end_fmt,
-            "-i", str(video_path), "-vn", "-acodec", "libmp3lame", "-q:a", "2",
-            str(output_path)
-        ]
-        subprocess.run(cmd, check=True, capture_output=True)
-        
-        print(f"[VOICE] YouTube clip extracted: {output_path.name}")
-        return output_path
+    start_fmt = format_time(parse_time(start))
+    end_fmt = format_time(parse_time(end))
+    
+    # Let yt-dlp fetch just the [start, end] range instead of the full video
+    cmd = [
+        "yt-dlp", "-f", "ba/b",
+        "--download-sections", f"*{start_fmt}-{end_fmt}",
+        "--force-keyframes-at-cuts",
+        "-x", "--audio-format", "mp3", "--audio-quality", "2",
+        "-o", str(output_dir / "yt_clip.%(ext)s"),
+        url
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        error_msg = result.stderr.strip() or result.stdout.strip() or "Unknown yt-dlp error"
+        raise RuntimeError(f"yt-dlp failed: {error_msg}")
+    
+    output_path = output_dir / "yt_clip.mp3"
+    if not output_path.exists():
+        raise RuntimeError("yt-dlp did not produce an MP3 clip")
+    
+    print(f"[VOICE] YouTube clip extracted: {output_path.name}")
+    return output_path
+
+
+def prune_vocals_cache():
+    """Evict least recently used vocal tracks beyond MAX_VOCALS_CACHE."""
+    cached = sorted(VOCALS_CACHE_DIR.glob("*_vocals.wav"), key=lambda p: p.stat().st_mtime)
+    for stale in cached[:-MAX_VOCALS_CACHE]:
+        stale.unlink(missing_ok=True)
 
 
 def isolate_vocals(audio_path: Path, output_dir: Path) -> Path:
-    """Isolate vocals using Demucs."""
+    """Isolate vocals using Demucs, reusing cached results for identical clips."""
+    VOCALS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_path = VOCALS_CACHE_DIR / f"{get_file_hash(audio_path)}_vocals.wav"
+    if cache_path.exists():
+        print(f"[VOICE] Using cached vocals: {cache_path.name}")
+        cache_path.touch()  # mark as recently used
+        return cache_path
+    
     print("[VOICE] Isolating vocals (Demucs)...")
     
     # Convert to WAV for Demucs
@@ -159,22 +223,29 @@ def isolate_vocals(audio_path: Path, output_dir: Path) -> Path:
            "-ar", "44100", "-ac", "2", str(wav_path)]
     subprocess.run(cmd, check=True, capture_output=True)
     
-    # Run Demucs
+    # Run Demucs with a pinned model and filename so the output path is known
     demucs_out = output_dir / "demucs_out"
     demucs_out.mkdir(exist_ok=True)
-    cmd = ["demucs", "--out", str(demucs_out), str(wav_path)]
+    cmd = ["demucs", "-n", DEMUCS_MODEL, "--two-stems", "vocals",
+           "--filename", "{stem}.{ext}", "--out", str(demucs_out), str(wav_path)]
     subprocess.run(cmd, check=True)
     
-    # Find vocals
-    escaped_stem = glob.escape(wav_path.stem)
-    pattern = str(demucs_out / "*" / escaped_stem / "vocals.*")
-    matches = glob.glob(pattern)
-    
-    if not matches:
+    vocals_path = demucs_out / DEMUCS_MODEL / "vocals.wav"
+    if not vocals_path.exists():
         print("[VOICE] Warning: Vocal isolation failed, using original audio")
         return audio_path
     
-    vocals_path = Path(matches[0])
+    # Copy under a temp name and rename, so a concurrent run never sees a
+    # partially written cache entry
+    fd, tmp_name = tempfile.mkstemp(dir=VOCALS_CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copy(vocals_path, tmp_name)
+        os.replace(tmp_name, cache_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    prune_vocals_cache()
     print(f"[VOICE] Vocals isolated: {vocals_path.name}")
     return vocals_path
 
@@ -214,11 +285,10 @@ def load_or_create_voice(voice_path: Path) -> tuple:
 
 
 def generate_speech(voice_wav: Path, transcript: str, text: str, output_path: Path):
-    """Generate speech using CosyVoice2."""
+    """Generate speech using CosyVoice2 and encode it straight to Opus."""
     print("[VOICE] Loading CosyVoice2 model...")
     from cosyvoice.cli.cosyvoice import CosyVoice2
     from cosyvoice.utils.file_utils import load_wav
-    import torchaudio
     import torch
     
     cosyvoice = CosyVoice2(str(MODEL_PATH), load_jit=False, load_trt=False, fp16=False)
@@ -232,50 +302,44 @@ def generate_speech(voice_wav: Path, transcript: str, text: str, output_path: Pa
         all_audio.append(result['tts_speech'])
     
     final_audio = torch.cat(all_audio, dim=1)
-    torchaudio.save(str(output_path), final_audio, cosyvoice.sample_rate)
+    encode_opus(final_audio, cosyvoice.sample_rate, output_path)
     print(f"[VOICE] Generated: {output_path}")
 
 
-def convert_to_mp3(wav_path: Path, mp3_path: Path):
-    """Convert WAV to MP3."""
-    cmd = ["ffmpeg", "-y", "-i", str(wav_path), "-codec:a", "libmp3lame", "-qscale:a", "2", str(mp3_path)]
-    subprocess.run(cmd, check=True, capture_output=True)
+def encode_opus(audio, sample_rate: int, opus_path: Path):
+    """Pipe raw float PCM into ffmpeg and encode Opus, skipping the WAV intermediate."""
+    pcm = audio.t().contiguous().float().numpy().tobytes()
+    cmd = ["ffmpeg", "-y", "-f", "f32le", "-ar", str(sample_rate), "-ac", str(audio.shape[0]),
+           "-i", "pipe:0", "-codec:a", "libopus", "-b:a", OPUS_BITRATE, str(opus_path)]
+    subprocess.run(cmd, input=pcm, check=True, capture_output=True)
 
 
 def upload_file(file_path: Path) -> str:
-    """Upload file to botbin.net."""
-    import json
+    """Upload file to botbin.net, streaming the multipart body from disk."""
     print("[VOICE] Uploading to botbin.net...")
     api_key = os.environ.get("BOTBIN_API_KEY")
     if not api_key:
         raise RuntimeError("BOTBIN_API_KEY not configured")
     
-    # Use -w to get HTTP status code, don't use -f (201 is valid success)
-    result = subprocess.run(
-        ["curl", "-s", "-X", "POST", BOTBIN_UPLOAD_URL,
-         "-H", f"Authorization: Bearer {api_key}",
-         "-F", f"file=@{file_path}",
-         "-F", "retention=168h",
-         "-w", "\n%{http_code}"],
-        capture_output=True, text=True, timeout=60
-    )
-    if result.returncode != 0:
-        raise RuntimeError(f"Upload failed: {result.stderr}")
+    with open(file_path, 'rb') as f:
+        body = MultipartEncoder(fields={
+            "file": (file_path.name, f, "audio/ogg"),
+            "retention": "168h",
+        })
+        response = HTTP_SESSION.post(
+            BOTBIN_UPLOAD_URL,
+            data=body,
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": body.content_type},
+            timeout=(CONNECT_TIMEOUT, 60)
+        )
     
-    # Parse response - last line is HTTP status code
-    lines = result.stdout.strip().rsplit("\n", 1)
-    if len(lines) != 2:
-        raise RuntimeError(f"Unexpected response format: {result.stdout}")
+    # 201 is a valid success status for botbin
+    if response.status_code not in (200, 201):
+        raise RuntimeError(f"Upload failed with status {response.status_code}: {response.text}")
     
-    body, status_code = lines
-    if status_code not in ("200", "201"):
-        raise RuntimeError(f"Upload failed with status {status_code}: {body}")
-    
-    # Parse JSON response
-    response = json.loads(body)
-    url = response.get("url")
+    url = response.json().get("url")
     if not url:
-        raise RuntimeError(f"No URL in response: {body}")
+        raise RuntimeError(f"No URL in response: {response.text}")
     print(f"[VOICE] Uploaded: {url}")
     return url
 
@@ -326,6 +390,17 @@ def main():
             print(f"Error: {e}")
             sys.exit(1)
     
+    # Validate voice source before creating any temp/output directories
+    source_url = args.youtube or args.voice_url
+    if source_url:
+        error = validate_url(source_url)
+        if error:
+            print(f"Error: {error}")
+            sys.exit(1)
+    elif not Path(args.file).exists():
+        print(f"Error: File not found: {args.file}")
+        sys.exit(1)
+    
     OUTPUT_DIR.mkdir(exist_ok=True)
     
     with tempfile.TemporaryDirectory() as tmp:
@@ -349,30 +424,23 @@ def main():
         else:
             # Local file mode
             voice_path = Path(args.file)
-            if not voice_path.exists():
-                print(f"Error: File not found: {voice_path}")
-                sys.exit(1)
         
         # Process voice and generate speech
         voice_wav, transcript = load_or_create_voice(voice_path)
         
-        output_wav = tmp_path / "output.wav"
-        generate_speech(voice_wav, transcript, text, output_wav)
-        
-        # Convert to MP3
-        output_mp3 = tmp_path / "output.mp3"
-        convert_to_mp3(output_wav, output_mp3)
+        output_opus = tmp_path / "output.opus"
+        generate_speech(voice_wav, transcript, text, output_opus)
         
         # Output
         if args.local:
             if args.output:
                 final_path = Path(args.output)
             else:
-                final_path = OUTPUT_DIR / f"voice_{hashlib.md5(text.encode()).hexdigest()[:8]}.mp3"
-            shutil.copy(output_mp3, final_path)
+                final_path = OUTPUT_DIR / f"voice_{hashlib.md5(text.encode()).hexdigest()[:8]}.opus"
+            shutil.copy(output_opus, final_path)
             print(f"\n[VOICE] Saved: {final_path}")
         else:
-            url = upload_file(output_mp3)
+            url = upload_file(output_opus)
             print(f"\n{url}")
 
 
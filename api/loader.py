@@ -137,9 +137,12 @@ class CommandLoader:
         
         Useful for hot-reloading during development.
         """
+        from api.utils.validation import clear_schema_cache
+        
         console.print("[cyan]Reloading all commands...[/cyan]")
         self.commands.clear()
         self.metadata.clear()
+        clear_schema_cache()
         
         # Reload modules
         for module_name in list(self.commands.keys()):
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import contextmanager
+
+import numpy as np
+
+from internal.knowledge import manager as kb_manager
+from internal.knowledge.manager import KnowledgeBaseManager
+
+
+class SourcesTableTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.chroma_path = os.path.join(self.tmp.name, "chroma_db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _manager(self):
+        manager = KnowledgeBaseManager(chroma_path=self.chroma_path, openai_api_key="test-key")
+        manager._fetch_content = lambda url: {"success": True, "text": "Some text. " * 50, "title": "Doc"}
+        manager._generate_embeddings = lambda texts: np.ones((len(texts), 4), dtype=np.float32)
+        return manager
+
+    def test_failed_sources_write_is_repaired_for_other_instances(self):
+        learner = self._manager()
+        lister = self._manager()
+
+        @contextmanager
+        def locked_sidecar():
+            raise sqlite3.OperationalError("database is locked")
+            yield
+
+        learner._connect_sidecar = locked_sidecar
+        self.assertTrue(learner.learn_from_url("http://example.com/doc")["success"])
+
+        self.assertEqual([s["url"] for s in lister.list_sources()], ["http://example.com/doc"])
+
+
+class EmbeddingCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = KnowledgeBaseManager(
+            chroma_path=os.path.join(self.tmp.name, "chroma_db"), openai_api_key="test-key"
+        )
+        self.api_calls = 0
+
+        async def fake_embed(texts):
+            self.api_calls += 1
+            rng = np.random.default_rng(len(texts))
+            return rng.standard_normal((len(texts), 8)).astype(np.float32)
+
+        self.manager._generate_embeddings_async = fake_embed
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fresh_and_cached_embeddings_match(self):
+        fresh = self.manager._generate_embeddings(["alpha", "beta"])
+        cached = self.manager._generate_embeddings(["alpha", "beta"])
+        self.assertEqual(self.api_calls, 1)
+        np.testing.assert_array_equal(fresh, cached)
+
+
+class EncodingLoadTests(unittest.TestCase):
+    def setUp(self):
+        self.saved = (kb_manager.tiktoken, kb_manager._ENCODING, kb_manager._ENCODING_RETRY_AT)
+        kb_manager._ENCODING = None
+        kb_manager._ENCODING_RETRY_AT = 0.0
+        self.attempts = 0
+        test = self
+
+        class FlakyTiktoken:
+            @staticmethod
+            def get_encoding(name):
+                test.attempts += 1
+                if test.attempts == 1:
+                    raise OSError("network unreachable")
+                return "encoding"
+
+        kb_manager.tiktoken = FlakyTiktoken
+
+    def tearDown(self):
+        kb_manager.tiktoken, kb_manager._ENCODING, kb_manager._ENCODING_RETRY_AT = self.saved
+
+    def test_failed_load_is_retried_after_backoff(self):
+        self.assertIsNone(kb_manager._get_encoding())
+        self.assertIsNone(kb_manager._get_encoding())
+        self.assertEqual(self.attempts, 1)
+
+        kb_manager._ENCODING_RETRY_AT = 0.0  # backoff elapsed
+        self.assertEqual(kb_manager._get_encoding(), "encoding")
+        self.assertEqual(kb_manager._get_encoding(), "encoding")
+        self.assertEqual(self.attempts, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
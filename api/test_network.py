@@ -0,0 +1,27 @@
+import unittest
+
+from api.utils.network import is_private_host
+
+
+class PrivateHostTests(unittest.TestCase):
+    def test_full_rfc1918_172_range_is_blocked(self):
+        for host in ("172.16.0.1", "172.17.0.1", "172.31.255.254"):
+            with self.subTest(host=host):
+                self.assertTrue(is_private_host(host))
+
+    def test_loopback_and_link_local_are_blocked(self):
+        for host in ("127.0.0.1", "0.0.0.0", "::1", "[::1]", "169.254.169.254", "10.1.2.3", "192.168.1.1"):
+            with self.subTest(host=host):
+                self.assertTrue(is_private_host(host))
+
+    def test_public_addresses_are_allowed(self):
+        for host in ("172.32.0.1", "8.8.8.8", "2606:4700:4700::1111"):
+            with self.subTest(host=host):
+                self.assertFalse(is_private_host(host))
+
+    def test_localhost_name_is_blocked(self):
+        self.assertTrue(is_private_host("localhost"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from api.router import ArgumentSchema
+from api.utils.validation import validate_arguments
+
+
+SCHEMA = [
+    ArgumentSchema(name="nick", type="user", description="Target nick"),
+    ArgumentSchema(name="count", type="int", description="How many"),
+    ArgumentSchema(name="channel", type="channel", required=False),
+]
+
+
+class ValidateArgumentsTests(unittest.TestCase):
+    def test_valid_arguments(self):
+        self.assertEqual(validate_arguments(["Lolo[bot]", "3", "#chat"], SCHEMA), (True, ()))
+
+    def test_missing_required_argument(self):
+        is_valid, errors = validate_arguments(["Lolo"], SCHEMA)
+        self.assertFalse(is_valid)
+        self.assertEqual(errors, ["Missing required argument: count (How many)"])
+
+    def test_invalid_values_are_all_reported(self):
+        is_valid, errors = validate_arguments(["bad nick", "x", "chat"], SCHEMA)
+        self.assertFalse(is_valid)
+        self.assertEqual(len(errors), 3)
+
+    def test_nickname_must_be_ascii(self):
+        self.assertTrue(validate_arguments(["a_b-[c]{d}|e\\f^g`", "1"], SCHEMA)[0])
+        self.assertFalse(validate_arguments(["Lolö", "1"], SCHEMA)[0])
+
+    def test_schema_is_compiled_once(self):
+        from api.utils.validation import _compile_schema
+        self.assertIs(_compile_schema(SCHEMA), _compile_schema(SCHEMA))
+
+    def test_schema_edited_in_place_is_recompiled(self):
+        schema = [ArgumentSchema(name="count", type="int")]
+        self.assertFalse(validate_arguments(["x"], schema)[0])
+        schema[0] = ArgumentSchema(name="count", type="string")
+        self.assertTrue(validate_arguments(["x"], schema)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
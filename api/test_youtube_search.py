@@ -0,0 +1,44 @@
+import unittest
+
+from api.tools.youtube_search import YouTubeSearchTool
+
+
+class VideoIdTests(unittest.TestCase):
+    def setUp(self):
+        self.tool = YouTubeSearchTool()
+
+    def test_bare_id(self):
+        self.assertEqual(self.tool._get_video_id("dQw4w9WgXcQ"), "dQw4w9WgXcQ")
+
+    def test_watch_url(self):
+        self.assertEqual(
+            self.tool._get_video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42"),
+            "dQw4w9WgXcQ",
+        )
+
+    def test_short_url(self):
+        self.assertEqual(self.tool._get_video_id("https://youtu.be/dQw4w9WgXcQ?si=abc"), "dQw4w9WgXcQ")
+
+    def test_unrecognized_query_is_returned_unchanged(self):
+        self.assertEqual(self.tool._get_video_id("not a video"), "not a video")
+
+
+class DurationTests(unittest.TestCase):
+    def setUp(self):
+        self.tool = YouTubeSearchTool()
+
+    def test_full_duration(self):
+        self.assertEqual(self.tool._format_duration("PT1H2M3S"), "1h 2m 3s")
+
+    def test_partial_durations_have_no_trailing_space(self):
+        self.assertEqual(self.tool._format_duration("PT1H"), "1h")
+        self.assertEqual(self.tool._format_duration("PT4M"), "4m")
+
+    def test_days_and_zero(self):
+        self.assertEqual(self.tool._format_duration("P1DT2H"), "1d 2h")
+        self.assertEqual(self.tool._format_duration("P0D"), "0d")
+        self.assertEqual(self.tool._format_duration("PT0S"), "0s")
+
+
+if __name__ == "__main__":
+    unittest.main()
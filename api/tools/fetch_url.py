@@ -5,9 +5,11 @@ Fetches and extracts readable content from web pages, bypassing bot protection.
 """
 
 import re
+import socket
 from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 from .base import Tool
+from api.utils.network import is_private_host
 
 
 class FetchUrlTool(Tool):
@@ -113,13 +115,12 @@ For PDFs: Use page numbers like "Page 5" or section titles.""",
                 return False, "Invalid URL: no host found"
             
             # Block local/private IPs
-            host = parsed.netloc.split(":")[0].lower()
-            blocked = ["localhost", "127.0.0.1", "0.0.0.0", "::1", "10.", "192.168.", "172.16."]
-            for b in blocked:
-                if host.startswith(b) or host == b.rstrip("."):
-                    return False, "Cannot fetch local/private URLs"
+            if is_private_host(parsed.hostname or ""):
+                return False, "Cannot fetch local/private URLs"
             
             return True, ""
+        except socket.gaierror:
+            return False, "Invalid URL: could not resolve host"
         except Exception as e:
             return False, f"Invalid URL: {str(e)}"
     
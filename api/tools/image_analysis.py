@@ -2,7 +2,7 @@
 import base64
 import os
 from pathlib import Path
-from typing import Dict, Optional
+from typing import BinaryIO, Dict, Optional, Union
 from PIL import Image
 import io
 import math
@@ -10,13 +10,24 @@ import json
 from .base import Tool
 from api.utils.image_downloader import ImageDownloader
 
+# An image on disk or already loaded into memory
+ImageSource = Union[Path, bytes]
 
-def validate_image_format(file_path: Path) -> tuple[bool, Optional[str]]:
+
+def _open_source(source: ImageSource) -> Union[Path, BinaryIO]:
+    """Return something PIL's Image.open can read for the given source."""
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    return source
+
+
+def validate_image_format(file_path: ImageSource, extension: Optional[str] = None) -> tuple[bool, Optional[str]]:
     """
     Validate that the image is in a supported format.
     
     Args:
-        file_path: Path to the image file
+        file_path: Path to the image file, or the image bytes
+        extension: File extension to check (defaults to the path's suffix)
     
     Returns:
         Tuple of (is_valid, error_message)
@@ -24,13 +35,13 @@ def validate_image_format(file_path: Path) -> tuple[bool, Optional[str]]:
     supported_formats = {'.png', '.jpg', '.jpeg', '.webp', '.gif'}
     
     # Check file extension
-    extension = file_path.suffix.lower()
+    extension = (extension or file_path.suffix).lower()
     if extension not in supported_formats:
         return False, f"Unsupported format: {extension}. Supported formats: PNG, JPEG, WEBP, GIF"
     
     try:
         # Open and validate with PIL
-        with Image.open(file_path) as img:
+        with Image.open(_open_source(file_path)) as img:
             # Check if GIF is animated
             if extension == '.gif':
                 try:
@@ -49,18 +60,18 @@ def validate_image_format(file_path: Path) -> tuple[bool, Optional[str]]:
         return False, f"Invalid or corrupted image file: {str(e)}"
 
 
-def validate_file_size(file_path: Path, max_size_mb: int = 50) -> tuple[bool, Optional[str]]:
+def validate_file_size(file_path: ImageSource, max_size_mb: int = 50) -> tuple[bool, Optional[str]]:
     """
     Validate that the file size is within limits.
     
     Args:
-        file_path: Path to the image file
+        file_path: Path to the image file, or the image bytes
         max_size_mb: Maximum file size in megabytes
     
     Returns:
         Tuple of (is_valid, error_message)
     """
-    file_size = file_path.stat().st_size
+    file_size = len(file_path) if isinstance(file_path, bytes) else file_path.stat().st_size
     max_size_bytes = max_size_mb * 1024 * 1024
     
     if file_size > max_size_bytes:
@@ -70,27 +81,29 @@ def validate_file_size(file_path: Path, max_size_mb: int = 50) -> tuple[bool, Op
     return True, None
 
 
-def encode_image_to_base64(file_path: Path) -> str:
+def encode_image_to_base64(file_path: ImageSource) -> str:
     """
     Encode an image file to base64 string.
     
     Args:
-        file_path: Path to the image file
+        file_path: Path to the image file, or the image bytes
     
     Returns:
         Base64-encoded string of the image
     """
+    if isinstance(file_path, bytes):
+        return base64.b64encode(file_path).decode("utf-8")
     with open(file_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
 
-def calculate_image_tokens(file_path: Path, detail: str = "auto") -> int:
+def calculate_image_tokens(file_path: ImageSource, detail: str = "auto") -> int:
     """
     Calculate the token cost for an image based on its dimensions.
     Uses the formula from docs/image_usage.md for gpt-5.1 (same as gpt-5-mini).
     
     Args:
-        file_path: Path to the image file
+        file_path: Path to the image file, or the image bytes
         detail: Detail level ('low', 'high', 'auto')
     
     Returns:
@@ -101,7 +114,7 @@ def calculate_image_tokens(file_path: Path, detail: str = "auto") -> int:
         return 85
     
     try:
-        with Image.open(file_path) as img:
+        with Image.open(_open_source(file_path)) as img:
             width, height = img.size
         
         # Calculate patches needed (32px x 32px patches)
@@ -143,13 +156,13 @@ def calculate_image_tokens(file_path: Path, detail: str = "auto") -> int:
         return 1000
 
 
-def smart_detail_selection(file_path: Path, detail: str = "auto") -> str:
+def smart_detail_selection(file_path: ImageSource, detail: str = "auto") -> str:
     """
     Intelligently select detail level based on image characteristics.
     Optimizes token usage while maintaining quality.
     
     Args:
-        file_path: Path to the image file
+        file_path: Path to the image file, or the image bytes
         detail: Requested detail level
     
     Returns:
@@ -159,7 +172,7 @@ def smart_detail_selection(file_path: Path, detail: str = "auto") -> str:
         return detail
     
     try:
-        with Image.open(file_path) as img:
+        with Image.open(_open_source(file_path)) as img:
             width, height = img.size
             
             # Use low detail for small images (< 512x512)
@@ -239,12 +252,12 @@ class ImageAnalysisTool(Tool):
         Returns:
             JSON string with image data formatted for API and metadata
         """
-        temp_file = None
+        downloaded = None
         
         try:
             # Handle URLs by downloading first
             if image_source.startswith(("http://", "https://")):
-                temp_file, error = self.downloader.download_image(image_source)
+                downloaded, error = self.downloader.download_image(image_source)
                 
                 if error:
                     return json.dumps({
@@ -253,8 +266,9 @@ class ImageAnalysisTool(Tool):
                         "suggestion": "Check that the URL is accessible and points to a valid image."
                     })
                 
-                # Use the downloaded file
-                file_path = temp_file
+                # Use the downloaded image (in memory unless it was large)
+                file_path = downloaded.data if downloaded.data is not None else downloaded.path
+                extension = downloaded.extension
                 source_type = "url"
                 original_source = image_source
             else:
@@ -264,11 +278,12 @@ class ImageAnalysisTool(Tool):
                     cwd = Path(os.environ.get('ORIGINAL_CWD', os.getcwd()))
                     file_path = cwd / file_path
                 
+                extension = file_path.suffix.lower()
                 source_type = "file"
                 original_source = str(file_path)
             
             # Check if file exists
-            if not file_path.exists():
+            if isinstance(file_path, Path) and not file_path.exists():
                 return json.dumps({
                     "status": "error",
                     "error": f"Image file not found: {file_path}",
@@ -276,7 +291,7 @@ class ImageAnalysisTool(Tool):
                 })
             
             # Validate format
-            is_valid, error = validate_image_format(file_path)
+            is_valid, error = validate_image_format(file_path, extension)
             if not is_valid:
                 return json.dumps({
                     "status": "error",
@@ -301,7 +316,6 @@ class ImageAnalysisTool(Tool):
             base64_image = encode_image_to_base64(file_path)
             
             # Determine MIME type
-            extension = file_path.suffix.lower()
             mime_types = {
                 '.png': 'image/png',
                 '.jpg': 'image/jpeg',
@@ -342,6 +356,6 @@ class ImageAnalysisTool(Tool):
             })
         
         finally:
-            # Clean up temporary file if it was downloaded
-            if temp_file:
-                self.downloader.cleanup(temp_file)
+            # Clean up temporary file if the download was spilled to disk
+            if downloaded:
+                self.downloader.cleanup(downloaded)
@@ -6,11 +6,14 @@ Supports direct audio URLs or YouTube videos with time range extraction.
 Uploads results to botbin.net for sharing via IRC.
 """
 
+import os
+import socket
 import subprocess
 from pathlib import Path
 from typing import Any, Dict, Optional
 from urllib.parse import urlparse
 from .base import Tool
+from api.utils.network import is_private_host
 from api.utils.output import log_info, log_success, log_error
 
 
@@ -19,6 +22,7 @@ class VoiceSpeakTool(Tool):
     
     # Directory paths
     COSYVOICE_DIR = Path(__file__).parent.parent.parent / "CosyVoice"
+    VENV_BIN_DIR = COSYVOICE_DIR / ".venv" / "bin"
     
     # Timeouts
     VOICE_TIMEOUT = 300  # 5 minutes for full pipeline
@@ -93,12 +97,11 @@ Voice samples work best with 5-15 seconds of clear speech.""",
                 return False, "URL must start with http:// or https://"
             if not parsed.netloc:
                 return False, "Invalid URL: no host found"
-            host = parsed.netloc.split(":")[0].lower()
-            blocked = ["localhost", "127.0.0.1", "0.0.0.0", "::1", "10.", "192.168.", "172.16."]
-            for b in blocked:
-                if host.startswith(b) or host == b.rstrip("."):
-                    return False, "Cannot fetch local/private URLs"
+            if is_private_host(parsed.hostname or ""):
+                return False, "Cannot fetch local/private URLs"
             return True, ""
+        except socket.gaierror:
+            return False, "Invalid URL: could not resolve host"
         except Exception as e:
             return False, f"Invalid URL: {str(e)}"
     
@@ -115,6 +118,22 @@ Voice samples work best with 5-15 seconds of clear speech.""",
         else:
             raise ValueError(f"Invalid time format: {t}")
     
+    def _run_pipeline(self, args: list[str]) -> subprocess.CompletedProcess:
+        """Run voice.py in the CosyVoice venv."""
+        env = os.environ.copy()
+        env["PATH"] = f"{self.VENV_BIN_DIR}{os.pathsep}{env.get('PATH', '')}"
+        env["VIRTUAL_ENV"] = str(self.VENV_BIN_DIR.parent)
+        
+        return subprocess.run(
+            [str(self.VENV_BIN_DIR / "python"), "voice.py", *args],
+            cwd=str(self.COSYVOICE_DIR),
+            env=env,
+            capture_output=True,
+            text=True,
+            errors="replace",
+            timeout=self.VOICE_TIMEOUT
+        )
+    
     def execute(
         self,
         text: str,
@@ -140,8 +159,8 @@ Voice samples work best with 5-15 seconds of clear speech.""",
         if has_direct and has_youtube:
             return "Error: Provide either voice_url OR youtube_url, not both"
         
-        # Build command
-        cmd_parts = ["source", ".venv/bin/activate", "&&", "python", "voice.py"]
+        # Build voice.py arguments
+        args = []
         
         if has_youtube:
             if not start_time or not end_time:
@@ -165,40 +184,32 @@ Voice samples work best with 5-15 seconds of clear speech.""",
             if not valid:
                 return f"Error: {error}"
             
-            cmd_parts.extend(["-y", youtube_url, "-s", start_time, "-e", end_time])
+            args.extend(["-y", youtube_url, "-s", start_time, "-e", end_time])
             log_info(f"[VOICE_SPEAK] YouTube mode: {youtube_url} ({start_time} - {end_time})")
         else:
             valid, error = self._validate_url(voice_url)
             if not valid:
                 return f"Error: {error}"
             
-            cmd_parts.extend(["-v", voice_url])
+            args.extend(["-v", voice_url])
             log_info(f"[VOICE_SPEAK] Direct URL mode: {voice_url}")
         
-        # Add text (escape quotes)
-        escaped_text = text.replace('"', '\\"')
-        cmd_parts.append(f'"{escaped_text}"')
-        
-        cmd = " ".join(cmd_parts)
+        # Text is passed as a single argv entry, so no shell escaping is needed
+        args.extend(["--", text])
         
         log_info("[VOICE_SPEAK] Running voice synthesis pipeline...")
         
         try:
-            result = subprocess.run(
-                ["bash", "-c", cmd],
-                cwd=str(self.COSYVOICE_DIR),
-                capture_output=True,
-                text=True,
-                timeout=self.VOICE_TIMEOUT
-            )
+            result = self._run_pipeline(args)
+            stdout, stderr = result.stdout, result.stderr
             
             if result.returncode != 0:
-                error = result.stderr.strip() or result.stdout.strip() or "Unknown error"
+                error = stderr.strip() or stdout.strip() or "Unknown error"
                 log_error(f"[VOICE_SPEAK] Failed: {error}")
                 return f"Error: {error}"
             
             # The last line of stdout should be the URL
-            output_lines = result.stdout.strip().split('\n')
+            output_lines = stdout.strip().split('\n')
             url = output_lines[-1].strip()
             
             if not url.startswith("http"):
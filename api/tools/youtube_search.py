@@ -4,12 +4,145 @@ YouTube Search tool implementation.
 Provides ability to search YouTube, look up videos/channels, and read comments using the YouTube Data API v3.
 """
 
+import asyncio
+import concurrent.futures
 import os
+import re
+import string
 import datetime
-import requests
-from typing import Any, Dict, List, Optional, Union
+import time
+import httpx
+import orjson
+from collections import OrderedDict
+from threading import Lock, Thread
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, TypeVar, Union
 from .base import Tool
 
+
+class _TTLCache:
+    """Thread-safe cache whose entries expire after a fixed TTL (oldest evicted when full)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+# Per-data-type TTLs: channel IDs practically never change, search results go stale fastest
+_CHANNEL_ID_CACHE = _TTLCache(1024, 7 * 24 * 3600)
+_VIDEO_CACHE = _TTLCache(2048, 6 * 3600)
+_COMMENTS_CACHE = _TTLCache(1024, 6 * 3600)
+_SEARCH_CACHE = _TTLCache(512, 15 * 60)
+
+# Requests currently being fetched, so concurrent identical lookups share one API call.
+# Thread-safe futures, so lookups also coalesce with direct calls to the fetch helpers from other loops.
+_INFLIGHT: Dict[Any, concurrent.futures.Future] = {}
+_INFLIGHT_LOCK = Lock()
+
+T = TypeVar("T")
+
+# One long-lived event loop (on a daemon thread) owns a keep-alive client, so
+# back-to-back tool calls reuse the connection to googleapis.com instead of
+# paying a new TCP+TLS handshake each time
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = Lock()
+_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared event loop, starting its thread on first use."""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            Thread(target=loop.run_forever, name="youtube-search", daemon=True).start()
+            _LOOP = loop
+    return _LOOP
+
+
+def _get_client(timeout: float) -> httpx.AsyncClient:
+    """Return the shared HTTP client (only call from the shared loop)."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+    return _CLIENT
+
+
+def _claim_inflight(keys: Sequence[Any]) -> Dict[Any, concurrent.futures.Future]:
+    """
+    Register this caller as the fetcher for every key nobody is fetching yet.
+
+    Args:
+        keys: In-flight keys wanted by the caller
+
+    Returns:
+        Dict mapping each key already being fetched to its pending future
+        (keys not in the dict are now owned by the caller)
+    """
+    pending = {}
+    with _INFLIGHT_LOCK:
+        for key in keys:
+            future = _INFLIGHT.get(key)
+            if future is None:
+                _INFLIGHT[key] = concurrent.futures.Future()
+            else:
+                pending[key] = future
+    return pending
+
+
+def _release_inflight(key: Any, result: Any = None, error: Optional[BaseException] = None) -> None:
+    """Publish the outcome for an owned key to its waiters and unregister it."""
+    with _INFLIGHT_LOCK:
+        future = _INFLIGHT.pop(key)
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+async def _coalesce(key: Any, fetch: Callable[[], Awaitable[T]]) -> T:
+    """Run fetch() unless an identical request is in flight, in which case await its result."""
+    pending = _claim_inflight([key])
+    if key in pending:
+        return await asyncio.wrap_future(pending[key])
+    try:
+        result = await fetch()
+    except BaseException as e:
+        _release_inflight(key, error=e)
+        raise
+    _release_inflight(key, result)
+    return result
+
+
+_RE_VIDEO_URL = re.compile(r'(?:v=|/)([\w-]{11})(?:\?|&|/|$)')
+_RE_SHORT_URL = re.compile(r'youtu\.be/([\w-]{11})')
+_VIDEO_ID_CHARS = frozenset(string.ascii_letters + string.digits + "_-")
+_DUR_RE = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?")
+_DUR_UNITS = ("d", "h", "m", "s")
+
+
 class YouTubeSearchTool(Tool):
     """
     Tool for interacting with YouTube Data API v3.
@@ -17,6 +150,8 @@ class YouTubeSearchTool(Tool):
     """
     
     BASE_URL = "https://www.googleapis.com/youtube/v3"
+    REQUEST_TIMEOUT = 10
+    MAX_IDS_PER_REQUEST = 50  # videos.list limit
     
     def __init__(self):
         """Initialize YouTube tool."""
@@ -59,120 +194,188 @@ class YouTubeSearchTool(Tool):
 
     def _get_video_id(self, query: str) -> str:
         """Extract video ID from URL or return query if it looks like an ID."""
-        import re
+        # Fast path: already a bare 11-char video ID
+        if len(query) == 11 and all(c in _VIDEO_ID_CHARS for c in query):
+            return query
         # Standard YouTube URL
-        match = re.search(r'(?:v=|/)([\w-]{11})(?:\?|&|/|$)', query)
+        match = _RE_VIDEO_URL.search(query)
         if match:
             return match.group(1)
         # Short URL (youtu.be)
-        match = re.search(r'youtu\.be/([\w-]{11})', query)
+        match = _RE_SHORT_URL.search(query)
         if match:
             return match.group(1)
-        
-        # Assume it's an ID if it's 11 chars
-        if len(query) == 11 and re.match(r'^[\w-]+$', query):
-            return query
             
         return query
 
-    def _get_channel_id_by_username(self, username: str) -> Optional[str]:
+    async def _api_get(self, client: httpx.AsyncClient, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET a YouTube Data API endpoint and return the decoded JSON body."""
+        resp = await client.get(f"{self.BASE_URL}/{endpoint}", params={**params, "key": self.api_key})
+        resp.raise_for_status()
+        return orjson.loads(resp.content)
+
+    async def _get_channel_id_by_username(self, client: httpx.AsyncClient, username: str) -> Optional[str]:
         """Resolve a username/handle to a channel ID."""
         # Clean handle
         username = username.strip().lstrip('@')
         
-        url = f"{self.BASE_URL}/search"
+        cached = _CHANNEL_ID_CACHE.get(username.lower())
+        if cached:
+            return cached
+        
+        return await _coalesce(
+            ("channel_id", username.lower()),
+            lambda: self._fetch_channel_id(client, username)
+        )
+
+    async def _fetch_channel_id(self, client: httpx.AsyncClient, username: str) -> Optional[str]:
+        """Look up a channel ID by name via the search endpoint."""
         params = {
             "part": "snippet",
             "q": username,
             "type": "channel",
-            "maxResults": 1,
-            "key": self.api_key
+            "maxResults": 1
         }
         
         try:
-            resp = requests.get(url, params=params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
+            data = await self._api_get(client, "search", params)
             
             if "items" in data and len(data["items"]) > 0:
-                return data["items"][0]["snippet"]["channelId"]
+                channel_id = data["items"][0]["snippet"]["channelId"]
+                _CHANNEL_ID_CACHE.set(username.lower(), channel_id)
+                return channel_id
             return None
         except Exception:
             return None
 
     def execute(self, action: str, query: str, max_results: int = 5, **kwargs) -> str:
         """Execute YouTube API request."""
+        return self._submit(action, query, max_results).result()
+
+    async def execute_async(self, action: str, query: str, max_results: int = 5, **kwargs) -> str:
+        """Execute YouTube API request (async)."""
+        return await asyncio.wrap_future(self._submit(action, query, max_results))
+
+    def _submit(self, action: str, query: str, max_results: int) -> concurrent.futures.Future:
+        """Schedule a request on the shared event loop."""
+        return asyncio.run_coroutine_threadsafe(self._execute(action, query, max_results), _get_loop())
+
+    async def _execute(self, action: str, query: str, max_results: int) -> str:
+        """Run a request on the shared loop with the shared keep-alive client."""
         if not self.api_key:
             return "Error: GOOGLE_API_KEY not found in environment variables."
 
         try:
+            client = _get_client(self.REQUEST_TIMEOUT)
             if action == "search":
-                return self._search_videos(query, max_results)
+                return await self._search_videos(client, query, max_results)
             elif action == "video_details":
                 video_id = self._get_video_id(query)
-                return self._get_video_details(video_id)
+                return await self._get_video_details(client, video_id)
             elif action == "channel_details":
-                return self._get_channel_details(query)
+                return await self._get_channel_details(client, query)
             elif action == "comments":
                 video_id = self._get_video_id(query)
-                return self._get_comments(video_id, max_results)
+                return await self._get_comments(client, video_id, max_results)
             else:
                 return f"Error: Unknown action '{action}'"
         except Exception as e:
             return f"YouTube API Error: {str(e)}"
 
-    def _search_videos(self, query: str, max_results: int) -> str:
+    async def _search_videos(self, client: httpx.AsyncClient, query: str, max_results: int) -> str:
         """Search for videos."""
-        url = f"{self.BASE_URL}/search"
+        cache_key = (query, max_results)
+        cached = _SEARCH_CACHE.get(cache_key)
+        if cached:
+            return cached
+        
+        return await _coalesce(("search",) + cache_key, lambda: self._fetch_search(client, query, max_results))
+
+    async def _fetch_search(self, client: httpx.AsyncClient, query: str, max_results: int) -> str:
+        """Fetch and format search results, caching them."""
         params = {
             "part": "snippet",
             "q": query,
             "type": "video",
-            "maxResults": min(max_results, 10),
-            "key": self.api_key
+            "maxResults": min(max_results, 10)
         }
         
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        data = await self._api_get(client, "search", params)
         
         if not data.get("items"):
             return f"No videos found for '{query}'."
 
-        results = []
-        for item in data["items"]:
-            snippet = item["snippet"]
-            video_id = item["id"]["videoId"]
-            title = snippet["title"]
-            channel = snippet["channelTitle"]
-            
-            results.append(f"• {title} ({channel}) - https://youtu.be/{video_id}")
-            
-        return f"YouTube Search Results for '{query}':\n" + "\n".join(results)
+        result = "\n".join([
+            f"YouTube Search Results for '{query}':",
+            *(
+                f"• {item['snippet']['title']} ({item['snippet']['channelTitle']}) - https://youtu.be/{item['id']['videoId']}"
+                for item in data["items"]
+            ),
+        ])
+        _SEARCH_CACHE.set((query, max_results), result)
+        return result
 
-    def _get_video_details(self, video_id: str) -> str:
+    async def _get_video_details(self, client: httpx.AsyncClient, video_id: str) -> str:
         """Get details for a specific video."""
-        url = f"{self.BASE_URL}/videos"
-        params = {
-            "part": "snippet,statistics,contentDetails",
-            "id": video_id,
-            "key": self.api_key
-        }
-        
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        
-        if not data.get("items"):
-            return f"Video not found (ID: {video_id})."
-            
-        video = data["items"][0]
+        details = await self._get_videos_details_bulk(client, [video_id])
+        return details.get(video_id) or f"Video not found (ID: {video_id})."
+
+    async def _get_videos_details_bulk(self, client: httpx.AsyncClient, video_ids: Sequence[str]) -> Dict[str, str]:
+        """
+        Get formatted details for many videos, up to 50 IDs per API request.
+
+        Args:
+            client: HTTP client for this call
+            video_ids: Video IDs to look up
+
+        Returns:
+            Dict mapping each found video ID to its formatted details
+        """
+        details: Dict[str, str] = {}
+        missing: List[str] = []
+        for video_id in dict.fromkeys(video_ids):
+            cached = _VIDEO_CACHE.get(video_id)
+            if cached:
+                details[video_id] = cached
+            else:
+                missing.append(video_id)
+
+        # IDs another call is already fetching are awaited instead of requested again
+        pending = _claim_inflight([("video", video_id) for video_id in missing])
+        owned = [video_id for video_id in missing if ("video", video_id) not in pending]
+
+        batches = [owned[i:i + self.MAX_IDS_PER_REQUEST] for i in range(0, len(owned), self.MAX_IDS_PER_REQUEST)]
+        try:
+            responses = await asyncio.gather(*(
+                self._api_get(client, "videos", {"part": "snippet,statistics,contentDetails", "id": ",".join(batch)})
+                for batch in batches
+            ))
+            for data in responses:
+                for video in data.get("items", []):
+                    result = self._format_video_details(video)
+                    _VIDEO_CACHE.set(video["id"], result)
+                    details[video["id"]] = result
+        except BaseException as e:
+            for video_id in owned:
+                _release_inflight(("video", video_id), error=e)
+            raise
+
+        for video_id in owned:
+            _release_inflight(("video", video_id), details.get(video_id))
+
+        for (_, video_id), future in pending.items():
+            result = await asyncio.wrap_future(future)
+            if result is not None:
+                details[video_id] = result
+        return details
+
+    def _format_video_details(self, video: Dict[str, Any]) -> str:
+        """Format a videos.list item for display."""
+        video_id = video["id"]
         snippet = video["snippet"]
         stats = video["statistics"]
         
-        # Parse duration (ISO 8601) - simple approximation
-        duration_raw = video["contentDetails"]["duration"]
-        duration = duration_raw.replace("PT", "").replace("H", "h ").replace("M", "m ").replace("S", "s").lower()
+        duration = self._format_duration(video["contentDetails"]["duration"])
         
         # Format stats
         views = int(stats.get("viewCount", 0))
@@ -190,29 +393,33 @@ class YouTubeSearchTool(Tool):
             f"Description: {snippet['description'][:200]}..." # Truncate desc
         )
 
-    def _get_channel_details(self, query: str) -> str:
+    def _format_duration(self, duration_raw: str) -> str:
+        """Format an ISO 8601 duration (e.g. PT1H2M3S) as '1h 2m 3s'."""
+        match = _DUR_RE.fullmatch(duration_raw)
+        if not match:
+            return duration_raw.lower()
+        parts = [f"{value}{unit}" for value, unit in zip(match.groups(), _DUR_UNITS) if value]
+        return " ".join(parts) or "0s"
+
+    async def _get_channel_details(self, client: httpx.AsyncClient, query: str) -> str:
         """Get channel statistics."""
         # First try to treat query as ID
         channel_id = query
         
         # If it doesn't look like an ID (usually start with UC), try search
         if not query.startswith("UC"):
-            resolved_id = self._get_channel_id_by_username(query)
+            resolved_id = await self._get_channel_id_by_username(client, query)
             if resolved_id:
                 channel_id = resolved_id
             else:
                  return f"Could not find channel '{query}'."
 
-        url = f"{self.BASE_URL}/channels"
         params = {
             "part": "snippet,statistics",
-            "id": channel_id,
-            "key": self.api_key
+            "id": channel_id
         }
         
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        data = await self._api_get(client, "channels", params)
         
         if not data.get("items"):
             return f"Channel not found (ID: {channel_id})."
@@ -234,22 +441,27 @@ class YouTubeSearchTool(Tool):
             f"🔗 URL: https://youtube.com/channel/{channel_id}"
         )
 
-    def _get_comments(self, video_id: str, max_results: int) -> str:
+    async def _get_comments(self, client: httpx.AsyncClient, video_id: str, max_results: int) -> str:
         """Get top comments for a video."""
-        url = f"{self.BASE_URL}/commentThreads"
+        cache_key = (video_id, max_results)
+        cached = _COMMENTS_CACHE.get(cache_key)
+        if cached:
+            return cached
+        
+        return await _coalesce(("comments",) + cache_key, lambda: self._fetch_comments(client, video_id, max_results))
+
+    async def _fetch_comments(self, client: httpx.AsyncClient, video_id: str, max_results: int) -> str:
+        """Fetch and format top comments, caching them."""
         params = {
             "part": "snippet",
             "videoId": video_id,
             "maxResults": min(max_results, 20),
             "order": "relevance", # Top comments
-            "textFormat": "plainText",
-            "key": self.api_key
+            "textFormat": "plainText"
         }
         
         try:
-            resp = requests.get(url, params=params, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
+            data = await self._api_get(client, "commentThreads", params)
         except Exception:
             # Comments might be disabled
             return f"Could not fetch comments for video {video_id} (might be disabled or private)."
@@ -257,16 +469,20 @@ class YouTubeSearchTool(Tool):
         if not data.get("items"):
             return "No comments found."
             
-        result_lines = [f"Top Comments for https://youtu.be/{video_id}:"]
+        result = "\n".join([
+            f"Top Comments for https://youtu.be/{video_id}:",
+            *(self._format_comment(item) for item in data["items"]),
+        ])
+        _COMMENTS_CACHE.set((video_id, max_results), result)
+        return result
+
+    def _format_comment(self, item: Dict[str, Any]) -> str:
+        """Format a commentThreads item as a single line."""
+        comment = item["snippet"]["topLevelComment"]["snippet"]
+        author = comment["authorDisplayName"]
+        text = comment["textDisplay"].replace("\n", " ")
+        if len(text) > 150:
+            text = text[:150] + "..."
         
-        for item in data["items"]:
-            comment = item["snippet"]["topLevelComment"]["snippet"]
-            author = comment["authorDisplayName"]
-            text = comment["textDisplay"].replace("\n", " ")
-            if len(text) > 150:
-                text = text[:150] + "..."
-            
-            likes = comment.get("likeCount", 0)
-            result_lines.append(f"- {author} ({likes} likes): {text}")
-            
-        return "\n".join(result_lines)
+        likes = comment.get("likeCount", 0)
+        return f"- {author} ({likes} likes): {text}"
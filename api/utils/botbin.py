@@ -4,16 +4,67 @@ Botbin upload utility.
 Provides file upload functionality to botbin.net for sharing images, audio, and text.
 """
 
+import io
+import mimetypes
+import orjson
 import os
-import tempfile
 import requests
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+from urllib3.util.retry import Retry
 
 
 BOTBIN_UPLOAD_URL = "https://botbin.net/upload"
 DEFAULT_RETENTION = "168h"  # 1 week
 
+# Shared session so uploads reuse pooled keep-alive connections to botbin.net.
+# Only connection failures are retried: they happen before any of the body is
+# sent, whereas the streamed multipart body can't be replayed after a partial
+# send (and urllib3 never retries POST on status codes by default anyway).
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, connect=3, read=False, status=False, backoff_factor=0.5)
+))
+
+
+def _guess_mime(filename: str) -> str:
+    """Guess a Content-Type for the upload from its filename."""
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def _post_multipart_streaming(source: BinaryIO, filename: str, retention: str, key: str) -> str:
+    """
+    POST a file to botbin with a streamed multipart body and return its URL.
+    
+    The body is encoded chunk-by-chunk from source while sending, so the
+    upload never holds a second full copy of the file in memory.
+    """
+    body = MultipartEncoder(fields={
+        "retention": retention,
+        "file": (filename, source, _guess_mime(filename)),
+    })
+    response = _SESSION.post(
+        BOTBIN_UPLOAD_URL,
+        headers={"Authorization": f"Bearer {key}", "Content-Type": body.content_type},
+        data=body,
+        timeout=60
+    )
+    
+    if response.status_code not in (200, 201):
+        raise ValueError(f"Upload failed: {response.status_code} {response.text}")
+    
+    # Response is JSON with url field
+    result = orjson.loads(response.content)
+    url = result.get("url")
+    if not url:
+        raise ValueError(f"No URL in response: {result}")
+    
+    return url
+
 
 def upload_to_botbin(
     file_bytes: bytes,
@@ -40,32 +91,7 @@ def upload_to_botbin(
     if not key:
         raise ValueError("BOTBIN_API_KEY not configured")
     
-    with tempfile.NamedTemporaryFile(suffix=Path(filename).suffix, delete=False) as tmp:
-        tmp.write(file_bytes)
-        tmp_path = tmp.name
-    
-    try:
-        with open(tmp_path, "rb") as f:
-            response = requests.post(
-                BOTBIN_UPLOAD_URL,
-                headers={"Authorization": f"Bearer {key}"},
-                files={"file": (filename, f)},
-                data={"retention": retention},
-                timeout=60
-            )
-        
-        if response.status_code not in (200, 201):
-            raise ValueError(f"Upload failed: {response.status_code} {response.text}")
-        
-        # Response is JSON with url field
-        result = response.json()
-        url = result.get("url")
-        if not url:
-            raise ValueError(f"No URL in response: {result}")
-        
-        return url
-    finally:
-        os.unlink(tmp_path)
+    return _post_multipart_streaming(io.BytesIO(file_bytes), filename, retention, key)
 
 
 def upload_file_to_botbin(
@@ -89,21 +115,4 @@ def upload_file_to_botbin(
         raise ValueError("BOTBIN_API_KEY not configured")
     
     with open(file_path, "rb") as f:
-        response = requests.post(
-            BOTBIN_UPLOAD_URL,
-            headers={"Authorization": f"Bearer {key}"},
-            files={"file": (file_path.name, f)},
-            data={"retention": retention},
-            timeout=60
-        )
-    
-    if response.status_code not in (200, 201):
-        raise ValueError(f"Upload failed: {response.status_code} {response.text}")
-    
-    # Response is JSON with url field
-    result = response.json()
-    url = result.get("url")
-    if not url:
-        raise ValueError(f"No URL in response: {result}")
-    
-    return url
+        return _post_multipart_streaming(f, file_path.name, retention, key)
@@ -5,11 +5,79 @@ Handles downloading images from URLs with common bypasses for bot blocks,
 Cloudflare protection, and other anti-scraping measures.
 """
 
+import io
 import requests
 import tempfile
+from PIL import Image
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Tuple
-import time
+from typing import BinaryIO, Optional, Tuple
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# Shared across downloader instances so concurrent downloads use one connection pool.
+# Transient failures are retried inside the pool with jittered exponential backoff;
+# the final 5xx/429 response is returned rather than raised so raise_for_status reports it.
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    backoff_jitter=0.5,
+    status_forcelist=[429, 502, 503, 504],
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=_RETRY)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+# Content-Type to file extension for supported image formats
+_CONTENT_TYPE_EXTENSIONS = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+}
+_URL_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+
+# Images up to this size stay in memory; larger ones are spilled to a temp file
+IN_MEMORY_LIMIT = 10 * 1024 * 1024  # 10MB
+
+
+def _sniff_image_magic(header: bytes) -> Optional[str]:
+    """Identify PNG/JPEG/GIF/WEBP from the first 12 bytes, or return None."""
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if header.startswith(b'GIF8'):
+        return 'gif'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+@dataclass
+class DownloadedImage:
+    """A downloaded image, held in memory or spilled to a temp file when large."""
+    extension: str
+    data: Optional[bytes] = None
+    path: Optional[Path] = None
+    
+    def open(self) -> BinaryIO:
+        """Open the image content for reading."""
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return open(self.path, "rb")
+    
+    def read_bytes(self) -> bytes:
+        """Return the full image content."""
+        if self.data is not None:
+            return self.data
+        return self.path.read_bytes()
 
 
 class ImageDownloader:
@@ -17,7 +85,7 @@ class ImageDownloader:
     
     def __init__(self):
         """Initialize downloader with common headers."""
-        self.session = requests.Session()
+        self.session = _SESSION
         
         # Common browser headers to bypass bot detection
         self.headers = {
@@ -38,112 +106,127 @@ class ImageDownloader:
         self, 
         url: str, 
         timeout: int = 30,
-        max_retries: int = 3
-    ) -> Tuple[Optional[Path], Optional[str]]:
+        strict_verify: bool = False
+    ) -> Tuple[Optional[DownloadedImage], Optional[str]]:
         """
-        Download an image from a URL to a temporary file.
+        Download an image from a URL.
+        
+        Images up to IN_MEMORY_LIMIT are kept in memory; larger ones are
+        written to a temporary file (remove it with cleanup()).
+        Connection errors and 429/502/503/504 responses are retried by
+        the session's transport adapter.
         
         Args:
             url: Image URL to download
             timeout: Request timeout in seconds
-            max_retries: Maximum number of retry attempts
+            strict_verify: Always run PIL's full verify(), even when the
+                header magic already identifies a supported format
             
         Returns:
-            Tuple of (temp_file_path, error_message)
-            If successful: (Path object, None)
+            Tuple of (image, error_message)
+            If successful: (DownloadedImage, None)
             If failed: (None, error message)
         """
-        last_error = None
-        
-        for attempt in range(max_retries):
-            try:
-                # Add delay between retries
-                if attempt > 0:
-                    time.sleep(2 ** attempt)  # Exponential backoff
+        try:
+            # Make request with headers
+            response = self.session.get(
+                url,
+                headers=self.headers,
+                timeout=timeout,
+                allow_redirects=True,
+                stream=True
+            )
+            
+            # Check for successful response
+            if response.status_code == 403:
+                # Try with different User-Agent for Cloudflare
+                alt_headers = self.headers.copy()
+                alt_headers['User-Agent'] = 'Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0'
                 
-                # Make request with headers
                 response = self.session.get(
                     url,
-                    headers=self.headers,
+                    headers=alt_headers,
                     timeout=timeout,
                     allow_redirects=True,
                     stream=True
                 )
-                
-                # Check for successful response
-                if response.status_code == 403:
-                    # Try with different User-Agent for Cloudflare
-                    alt_headers = self.headers.copy()
-                    alt_headers['User-Agent'] = 'Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0'
-                    
-                    response = self.session.get(
-                        url,
-                        headers=alt_headers,
-                        timeout=timeout,
-                        allow_redirects=True,
-                        stream=True
-                    )
-                
-                response.raise_for_status()
-                
-                # Verify content type is an image
-                content_type = response.headers.get('Content-Type', '').lower()
-                if not content_type.startswith('image/'):
-                    # Some servers don't set proper content-type, check by extension
-                    if not any(url.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.webp', '.gif']):
-                        return None, f"URL does not appear to be an image (Content-Type: {content_type})"
-                
-                # Determine file extension from content-type or URL
-                extension = self._get_extension(content_type, url)
-                
-                # Create temporary file
-                temp_file = tempfile.NamedTemporaryFile(
-                    suffix=extension,
-                    delete=False
-                )
-                
-                # Download in chunks to handle large files
-                total_size = 0
-                max_size = 50 * 1024 * 1024  # 50MB limit
-                
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        total_size += len(chunk)
-                        if total_size > max_size:
+            
+            response.raise_for_status()
+            
+            # Verify content type is an image
+            content_type = response.headers.get('Content-Type', '').lower()
+            if not content_type.startswith('image/'):
+                # Some servers don't set proper content-type, check by extension
+                if not url.lower().endswith(_URL_EXTENSIONS):
+                    return None, f"URL does not appear to be an image (Content-Type: {content_type})"
+            
+            # Reject oversized images from the headers, before reading any body
+            max_size = 50 * 1024 * 1024  # 50MB limit
+            content_length = response.headers.get('Content-Length', '')
+            if content_length.isdigit() and int(content_length) > max_size:
+                response.close()
+                return None, f"Image too large (>{max_size // (1024*1024)}MB)"
+            
+            # Determine file extension from content-type or URL
+            extension = self._get_extension(content_type, url)
+            
+            # Download in chunks, buffering in memory until IN_MEMORY_LIMIT
+            # (still size-checked, since Content-Length may be missing or wrong)
+            buffer = bytearray()
+            temp_file = None
+            total_size = 0
+            
+            for chunk in response.iter_content(chunk_size=8192):
+                if chunk:
+                    total_size += len(chunk)
+                    if total_size > max_size:
+                        if temp_file:
                             temp_file.close()
                             Path(temp_file.name).unlink(missing_ok=True)
-                            return None, f"Image too large (>{max_size // (1024*1024)}MB)"
+                        return None, f"Image too large (>{max_size // (1024*1024)}MB)"
+                    if temp_file:
                         temp_file.write(chunk)
-                
+                        continue
+                    buffer += chunk
+                    if len(buffer) > IN_MEMORY_LIMIT:
+                        # Spill to disk for large images
+                        temp_file = tempfile.NamedTemporaryFile(suffix=extension, delete=False)
+                        temp_file.write(buffer)
+                        buffer = bytearray()
+            
+            if temp_file:
                 temp_file.close()
-                
-                # Verify the file is a valid image
+                image = DownloadedImage(extension=extension, path=Path(temp_file.name))
+            else:
+                image = DownloadedImage(extension=extension, data=bytes(buffer))
+            
+            # Verify the content is a valid image: a known header magic is
+            # enough unless strict_verify is set, otherwise fall back to PIL
+            with image.open() as f:
+                header = f.read(12)
+            if strict_verify or _sniff_image_magic(header) is None:
                 try:
-                    from PIL import Image
-                    with Image.open(temp_file.name) as img:
+                    with image.open() as f, Image.open(f) as img:
                         img.verify()
                 except Exception as e:
-                    Path(temp_file.name).unlink(missing_ok=True)
+                    self.cleanup(image)
                     return None, f"Downloaded file is not a valid image: {str(e)}"
-                
-                return Path(temp_file.name), None
-                
-            except requests.exceptions.Timeout:
-                last_error = f"Request timed out after {timeout} seconds"
-            except requests.exceptions.ConnectionError:
-                last_error = "Connection failed - server may be unreachable"
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 403:
-                    last_error = "Access forbidden - image may be protected by anti-bot measures"
-                elif e.response.status_code == 404:
-                    last_error = "Image not found (404)"
-                else:
-                    last_error = f"HTTP error {e.response.status_code}"
-            except Exception as e:
-                last_error = f"Download failed: {str(e)}"
-        
-        # All retries failed
-        return None, f"Failed after {max_retries} attempts. Last error: {last_error}"
+            
+            return image, None
+            
+        except requests.exceptions.Timeout:
+            return None, f"Request timed out after {timeout} seconds"
+        except requests.exceptions.ConnectionError:
+            return None, "Connection failed - server may be unreachable"
+        except requests.exceptions.HTTPError as e:
+            if e.response.status_code == 403:
+                return None, "Access forbidden - image may be protected by anti-bot measures"
+            elif e.response.status_code == 404:
+                return None, "Image not found (404)"
+            else:
+                return None, f"HTTP error {e.response.status_code}"
+        except Exception as e:
+            return None, f"Download failed: {str(e)}"
     
     def _get_extension(self, content_type: str, url: str) -> str:
         """
@@ -156,38 +239,29 @@ class ImageDownloader:
         Returns:
             File extension with leading dot (e.g., '.png')
         """
-        # Map content-type to extension
-        type_map = {
-            'image/png': '.png',
-            'image/jpeg': '.jpg',
-            'image/jpg': '.jpg',
-            'image/webp': '.webp',
-            'image/gif': '.gif',
-        }
-        
         # Try content-type first
-        for mime_type, ext in type_map.items():
-            if mime_type in content_type.lower():
-                return ext
+        mime_type = content_type.split(';', 1)[0].strip().lower()
+        ext = _CONTENT_TYPE_EXTENSIONS.get(mime_type)
+        if ext:
+            return ext
         
-        # Fall back to URL extension
-        url_lower = url.lower()
-        for ext in ['.png', '.jpg', '.jpeg', '.webp', '.gif']:
-            if ext in url_lower:
-                return ext
+        # Fall back to URL path extension
+        _, dot, tail = urlparse(url).path.lower().rpartition('.')
+        if dot and f".{tail}" in _URL_EXTENSIONS:
+            return f".{tail}"
         
         # Default to .jpg
         return '.jpg'
     
-    def cleanup(self, file_path: Optional[Path]) -> None:
+    def cleanup(self, image: Optional[DownloadedImage]) -> None:
         """
-        Clean up temporary file.
+        Clean up the temporary file of a spilled download, if any.
         
         Args:
-            file_path: Path to temporary file to delete
+            image: Downloaded image to clean up
         """
-        if file_path and file_path.exists():
+        if image and image.path and image.path.exists():
             try:
-                file_path.unlink()
+                image.path.unlink()
             except Exception:
                 pass  # Ignore cleanup errors
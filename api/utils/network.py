@@ -0,0 +1,51 @@
+"""
+Network safety utilities for the Lolo Python API.
+
+Used by tools that fetch user-supplied URLs to refuse local/private targets.
+"""
+
+import ipaddress
+import socket
+from typing import Tuple
+
+
+def _resolve_host(host: str) -> Tuple[str, ...]:
+    """
+    Resolve a hostname to its addresses.
+
+    Deliberately uncached: the later fetch resolves the host again, so a
+    cached answer could pass a host whose DNS has since been repointed at a
+    private address.
+    """
+    infos = socket.getaddrinfo(host, None)
+    return tuple({info[4][0].split("%", 1)[0] for info in infos})
+
+
+def is_private_host(host: str) -> bool:
+    """
+    Check whether a host is, or resolves to, a non-public address.
+
+    Covers loopback, RFC 1918 private ranges, link-local, reserved,
+    multicast and unspecified addresses for both IPv4 and IPv6.
+
+    Args:
+        host: Hostname or IP literal (without port or brackets)
+
+    Returns:
+        True if any address for the host is non-public
+
+    Raises:
+        socket.gaierror: If the hostname cannot be resolved
+    """
+    host = host.strip("[]").lower()
+    try:
+        addresses: Tuple[str, ...] = (str(ipaddress.ip_address(host)),)
+    except ValueError:
+        addresses = _resolve_host(host)
+
+    for address in addresses:
+        ip = ipaddress.ip_address(address)
+        if (ip.is_private or ip.is_loopback or ip.is_link_local or
+                ip.is_reserved or ip.is_multicast or ip.is_unspecified):
+            return True
+    return False
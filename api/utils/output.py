@@ -1,40 +1,88 @@
 """
 Colored output utilities for the Lolo Python API.
 
-Provides consistent colored logging across the API.
+Provides consistent colored logging across the API. Log lines are written
+to stdout with pre-built ANSI color codes; set LOLO_USE_RICH=1 to render
+them through the rich console instead.
 """
 
+import os
+import sys
+import time
 from rich.console import Console
-from datetime import datetime
 
 console = Console()
 
+USE_RICH = os.getenv("LOLO_USE_RICH", "").lower() in ("1", "true", "yes")
+
+# Color only when writing to a terminal, following the NO_COLOR/FORCE_COLOR conventions
+_USE_COLOR = "NO_COLOR" not in os.environ and ("FORCE_COLOR" in os.environ or sys.stdout.isatty())
+
+
+def _ansi(code: str) -> str:
+    """ANSI SGR escape for code, or an empty string when color is off."""
+    return f"\033[{code}m" if _USE_COLOR else ""
+
+
+_BLUE = _ansi("34")
+_GREEN = _ansi("32")
+_RED = _ansi("31")
+_YELLOW = _ansi("33")
+_DIM = _ansi("2")
+_RESET = _ansi("0")
+
+
+def _timestamp() -> str:
+    """Current local time as HH:MM:SS."""
+    return time.strftime("%H:%M:%S")
+
+
+def _write(line: str) -> None:
+    """Write a single log line to stdout."""
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
 
 def log_info(message: str) -> None:
     """Log an info message in blue."""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    console.print(f"[blue][{timestamp}][/blue] {message}")
+    timestamp = _timestamp()
+    if USE_RICH:
+        console.print(f"[blue][{timestamp}][/blue] {message}")
+    else:
+        _write(f"{_BLUE}[{timestamp}]{_RESET} {message}")
 
 
 def log_success(message: str) -> None:
     """Log a success message in green."""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    console.print(f"[green][{timestamp}] ✓[/green] {message}")
+    timestamp = _timestamp()
+    if USE_RICH:
+        console.print(f"[green][{timestamp}] ✓[/green] {message}")
+    else:
+        _write(f"{_GREEN}[{timestamp}] ✓{_RESET} {message}")
 
 
 def log_error(message: str) -> None:
     """Log an error message in red."""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    console.print(f"[red][{timestamp}] ✗[/red] {message}")
+    timestamp = _timestamp()
+    if USE_RICH:
+        console.print(f"[red][{timestamp}] ✗[/red] {message}")
+    else:
+        _write(f"{_RED}[{timestamp}] ✗{_RESET} {message}")
 
 
 def log_warning(message: str) -> None:
     """Log a warning message in yellow."""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    console.print(f"[yellow][{timestamp}] ⚠[/yellow] {message}")
+    timestamp = _timestamp()
+    if USE_RICH:
+        console.print(f"[yellow][{timestamp}] ⚠[/yellow] {message}")
+    else:
+        _write(f"{_YELLOW}[{timestamp}] ⚠{_RESET} {message}")
 
 
 def log_debug(message: str) -> None:
     """Log a debug message in dim."""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    console.print(f"[dim][{timestamp}] DEBUG:[/dim] {message}")
+    timestamp = _timestamp()
+    if USE_RICH:
+        console.print(f"[dim][{timestamp}] DEBUG:[/dim] {message}")
+    else:
+        _write(f"{_DIM}[{timestamp}] DEBUG:{_RESET} {message}")
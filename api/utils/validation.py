@@ -4,7 +4,9 @@ Argument validation utilities for the Lolo Python API.
 Validates command arguments against their schema definitions.
 """
 
-from typing import List, Dict, Any, Tuple, Optional
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Optional, Callable, NamedTuple, Sequence
 from api.router import ArgumentSchema
 
 
@@ -17,7 +19,101 @@ class ValidationError(Exception):
         super().__init__("; ".join(errors))
 
 
-def validate_arguments(args: List[str], schema: List[ArgumentSchema]) -> Tuple[bool, List[str]]:
+Validator = Callable[[str], Optional[str]]
+
+_INT_RE = re.compile(r"[+-]?\d+")
+_FLOAT_RE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_NICK_RE = re.compile(r"[A-Za-z0-9_\-\[\]{}|\\^`]+")
+_CHANNEL_PREFIXES = ("#", "&")
+
+# Shared result for the common all-valid case
+_EMPTY_ERRORS: Tuple[str, ...] = ()
+
+
+# (name, type, required, description) per argument: everything compilation reads
+_SchemaKey = Tuple[Tuple[str, str, bool, str], ...]
+
+
+class _CompiledSchema(NamedTuple):
+    """Schema-derived data computed once per distinct argument list."""
+    required: Tuple[Tuple[str, str], ...]  # (name, description) of required arguments
+    validators: Tuple[Optional[Validator], ...]
+
+
+def _field_validator(name: str, arg_type: str, required: bool) -> Optional[Validator]:
+    """
+    Build the value check for one argument.
+    
+    Args:
+        name: Argument name
+        arg_type: Argument type from the schema
+        required: Whether the argument is required
+        
+    Returns:
+        Callable returning an error message or None, or None if any value is accepted
+    """
+
+    # Numbers are only checked, not converted, so match the syntax instead of parsing
+    if arg_type == "int":
+        return lambda value: None if _INT_RE.fullmatch(value) else (
+            f"Argument '{name}' must be an integer, got: {value}"
+        )
+    
+    if arg_type == "float":
+        return lambda value: None if _FLOAT_RE.fullmatch(value) else (
+            f"Argument '{name}' must be a number, got: {value}"
+        )
+    
+    if arg_type == "user":
+        # User should be a valid IRC nickname (ASCII alphanumeric, _, -, [, ], {, }, |, \, ^, `)
+        error = f"Argument '{name}' must be a valid IRC nickname"
+        return lambda value: None if _NICK_RE.fullmatch(value) else error
+    
+    if arg_type == "channel":
+        # Channel should start with # or &
+        error = f"Argument '{name}' must be a valid channel name (starting with # or &)"
+        return lambda value: None if value.startswith(_CHANNEL_PREFIXES) else error
+    
+    if arg_type == "string" and required:
+        # String is always valid, but check if empty when required
+        error = f"Argument '{name}' cannot be empty"
+        return lambda value: None if value.strip() else error
+    
+    # Add more type validations as needed
+    return None
+
+
+def _compile_schema(schema: List[ArgumentSchema]) -> _CompiledSchema:
+    """
+    Get the compiled form of a schema, building it on first use.
+    
+    Cached by schema contents rather than identity, so edited schemas are
+    recompiled and reloaded commands with unchanged schemas share an entry.
+    
+    Args:
+        schema: List of ArgumentSchema for a command
+        
+    Returns:
+        Compiled schema
+    """
+    return _compile_key(tuple((arg.name, arg.type, arg.required, arg.description) for arg in schema))
+
+
+@lru_cache(maxsize=256)
+def _compile_key(key: _SchemaKey) -> _CompiledSchema:
+    """Compile a schema from its contents key."""
+    return _CompiledSchema(
+        required=tuple((name, description) for name, _, required, description in key if required),
+        validators=tuple(_field_validator(name, arg_type, required) for name, arg_type, required, _ in key),
+    )
+
+
+def clear_schema_cache() -> None:
+    """Drop all compiled schemas (called when commands are reloaded)."""
+    _compile_key.cache_clear()
+
+
+def validate_arguments(args: List[str], schema: List[ArgumentSchema]) -> Tuple[bool, Sequence[str]]:
     """
     Validate command arguments against their schema.
     
@@ -28,67 +124,38 @@ def validate_arguments(args: List[str], schema: List[ArgumentSchema]) -> Tuple[b
     Returns:
         Tuple of (is_valid, error_messages)
         - is_valid: True if validation passed, False otherwise
-        - error_messages: List of validation error messages (empty if valid)
+        - error_messages: Validation error messages (empty tuple if valid)
     """
-    errors = []
+    compiled = _compile_schema(schema)
+    errors: Optional[List[str]] = None
     
     # Check required arguments
-    required_args = [arg for arg in schema if arg.required]
-    if len(args) < len(required_args):
-        missing = required_args[len(args):]
-        for arg in missing:
-            errors.append(f"Missing required argument: {arg.name} ({arg.description})")
+    if len(args) < len(compiled.required):
+        errors = [
+            f"Missing required argument: {name} ({description})"
+            for name, description in compiled.required[len(args):]
+        ]
     
     # Validate each provided argument
-    for i, arg_schema in enumerate(schema):
-        if i >= len(args):
-            # No more args provided
-            if arg_schema.required:
-                # Already handled above
-                pass
-            break
-        
-        arg_value = args[i]
-        
-        # Type validation
-        if arg_schema.type == "int":
-            try:
-                int(arg_value)
-            except ValueError:
-                errors.append(f"Argument '{arg_schema.name}' must be an integer, got: {arg_value}")
-        
-        elif arg_schema.type == "float":
-            try:
-                float(arg_value)
-            except ValueError:
-                errors.append(f"Argument '{arg_schema.name}' must be a number, got: {arg_value}")
-        
-        elif arg_schema.type == "user":
-            # User should be a valid IRC nickname (alphanumeric, _, -, [, ], {, }, |, \, ^, `)
-            if not arg_value or not all(c.isalnum() or c in "_-[]{}|\\^`" for c in arg_value):
-                errors.append(f"Argument '{arg_schema.name}' must be a valid IRC nickname")
-        
-        elif arg_schema.type == "channel":
-            # Channel should start with # or &
-            if not arg_value.startswith(("#", "&")):
-                errors.append(f"Argument '{arg_schema.name}' must be a valid channel name (starting with # or &)")
-        
-        elif arg_schema.type == "string":
-            # String is always valid, but check if empty when required
-            if arg_schema.required and not arg_value.strip():
-                errors.append(f"Argument '{arg_schema.name}' cannot be empty")
-        
-        # Add more type validations as needed
+    for validator, arg_value in zip(compiled.validators, args):
+        if validator is not None:
+            error = validator(arg_value)
+            if error is not None:
+                if errors is None:
+                    errors = []
+                errors.append(error)
     
-    return (len(errors) == 0, errors)
+    if errors is None:
+        return (True, _EMPTY_ERRORS)
+    return (False, errors)
 
 
-def format_validation_errors(errors: List[str]) -> str:
+def format_validation_errors(errors: Sequence[str]) -> str:
     """
     Format validation errors into a user-friendly message.
     
     Args:
-        errors: List of validation error messages
+        errors: Validation error messages (list or tuple)
         
     Returns:
         Formatted error message string
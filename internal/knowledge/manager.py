@@ -4,17 +4,28 @@ Knowledge Base Manager.
 Handles ingestion of documents into ChromaDB for RAG retrieval.
 """
 
+import asyncio
+import bisect
 import io
 import os
+import threading
 import time
 import hashlib
 import re
+import sqlite3
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from itertools import chain
+from typing import List, Dict, Any, Iterable, Iterator, Literal, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import chromadb
-from openai import OpenAI
+import httpx
+import numpy as np
+import tiktoken
+from openai import AsyncOpenAI, OpenAI
 
 # For PDF extraction
 try:
@@ -30,28 +41,155 @@ try:
 except ImportError:
     BS4_AVAILABLE = False
 
+# HTTP/2 needs the optional h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Shared so repeated ingests reuse pooled connections and TLS sessions
+_HTTP_CLIENT = httpx.Client(
+    http2=HTTP2_AVAILABLE,
+    timeout=30,
+    follow_redirects=True,
+    headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+)
+
+# URL hash for chunk ID prefixes (identifier only, not security-sensitive)
+try:
+    from blake3 import blake3 as _url_hasher
+except ImportError:
+    _url_hasher = hashlib.md5
+
+# Prefer the C-backed lxml parser for BeautifulSoup when installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+
+# Sentence end: terminal punctuation followed by whitespace
+_RE_SENTENCE_END = re.compile(r'[.!?]\s')
+
+# HTML extraction and title cleanup patterns
+_RE_TITLE = re.compile(r'<title[^>]*>([^<]+)</title>', re.IGNORECASE)
+_RE_SCRIPT = re.compile(r'<script[^>]*>.*?</script>', re.DOTALL | re.IGNORECASE)
+_RE_STYLE = re.compile(r'<style[^>]*>.*?</style>', re.DOTALL | re.IGNORECASE)
+_RE_TAG = re.compile(r'<[^>]+>')
+_RE_WS = re.compile(r'\s+')
+_RE_EXT = re.compile(r'\.[^.]+$')
+_RE_SEP = re.compile(r'[-_]')
+
+
+# Tokenizer, loaded on first use. Only a successful load is kept: after a failure
+# (e.g. the BPE file can't be downloaded) the load is retried after a backoff
+ENCODING_RETRY_SECONDS = 300
+_ENCODING: Optional["tiktoken.Encoding"] = None
+_ENCODING_RETRY_AT = 0.0
+_ENCODING_LOCK = threading.Lock()
+
+
+def _get_encoding() -> Optional["tiktoken.Encoding"]:
+    """Return the embedding tokenizer, or None while it cannot be loaded (e.g. offline)."""
+    global _ENCODING, _ENCODING_RETRY_AT
+    if _ENCODING is not None:
+        return _ENCODING
+    with _ENCODING_LOCK:
+        if _ENCODING is None and time.monotonic() >= _ENCODING_RETRY_AT:
+            try:
+                _ENCODING = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                _ENCODING_RETRY_AT = time.monotonic() + ENCODING_RETRY_SECONDS
+                print(
+                    f"Warning: tokenizer unavailable, falling back to character chunking "
+                    f"and estimated token counts (retrying in {ENCODING_RETRY_SECONDS}s): {e}"
+                )
+    return _ENCODING
+
+
+def _count_tokens(texts: List[str]) -> List[int]:
+    """Count embedding tokens per text (a conservative estimate without the tokenizer)."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return [len(text) // 2 + 1 for text in texts]
+    return [len(ids) for ids in encoding.encode_ordinary_batch(texts)]
+
+
+def _quantize_sq8(vec: np.ndarray) -> Tuple[float, bytes]:
+    """Scalar-quantize a vector to int8 with a per-vector scale."""
+    scale = float(np.abs(vec).max()) / 127 or 1.0
+    return scale, np.round(vec / scale).astype(np.int8).tobytes()
+
+
+def _dequantize_sq8(scale: Optional[float], blob: bytes) -> np.ndarray:
+    """Restore a cached vector (rows without a scale hold raw float32)."""
+    if scale is None:
+        return np.frombuffer(blob, dtype=np.float32)
+    return np.frombuffer(blob, dtype=np.int8).astype(np.float32) * np.float32(scale)
+
+
+# OpenAI clients by API key fingerprint, so the query cache below can be shared by managers
+_QUERY_CLIENTS: Dict[str, OpenAI] = {}
+
+
+@lru_cache(maxsize=1024)
+def _embed_query(api_key_id: str, model: str, query: str) -> Tuple[float, ...]:
+    """Embed a single search query (cached per key, model and query text)."""
+    response = _QUERY_CLIENTS[api_key_id].embeddings.create(input=[query], model=model)
+    return tuple(response.data[0].embedding)
+
 
 class KnowledgeBaseManager:
     """Manages the knowledge base ChromaDB collection."""
     
     # Chunk settings
-    CHUNK_SIZE = 1000  # Characters per chunk
-    CHUNK_OVERLAP = 150  # Overlap between chunks
+    CHUNK_SIZE_TOKENS = 800  # Tokens per chunk
+    CHUNK_OVERLAP_TOKENS = 100  # Overlap between chunks
+    CHUNK_SIZE = 1000  # Characters per chunk (when the tokenizer is unavailable)
+    CHUNK_OVERLAP = 150  # Overlap in characters (when the tokenizer is unavailable)
     
     # Embedding model
     EMBEDDING_MODEL = "text-embedding-3-small"
     
+    # Embedding request batching (API limits are 2048 inputs / 300k tokens per request)
+    EMBEDDING_BATCH_SIZE = 96
+    EMBEDDING_BATCH_TOKENS = 250_000
+    EMBEDDING_CONCURRENCY = 8
+    
     # Collection name
     COLLECTION_NAME = "knowledge_base"
     
-    def __init__(self, chroma_path: Optional[str] = None, openai_api_key: Optional[str] = None):
+    # HNSW index settings per profile ("fast" matches Chroma's defaults).
+    # Chroma fixes these when the collection is created; existing collections keep theirs.
+    HNSW_PROFILES = {
+        "fast": {"hnsw:construction_ef": 100, "hnsw:M": 16, "hnsw:search_ef": 10},
+        "balanced": {"hnsw:construction_ef": 200, "hnsw:M": 32, "hnsw:search_ef": 100},
+        "max": {"hnsw:construction_ef": 512, "hnsw:M": 48, "hnsw:search_ef": 256},
+    }
+    
+    # SQLite sidecar (embedding cache, per-source rollup), stored next to the ChromaDB directory
+    SIDECAR_DB_FILE = "knowledge_base.db"
+    CACHE_LOOKUP_BATCH = 500  # Hashes per IN (...) lookup
+    
+    def __init__(
+        self,
+        chroma_path: Optional[str] = None,
+        openai_api_key: Optional[str] = None,
+        hnsw_profile: Literal["fast", "balanced", "max"] = "balanced"
+    ):
         """
         Initialize the Knowledge Base Manager.
         
         Args:
             chroma_path: Path to ChromaDB storage. Defaults to data/chroma_db
             openai_api_key: OpenAI API key for embeddings.
+            hnsw_profile: HNSW recall/memory trade-off used when creating the collection.
         """
+        if hnsw_profile not in self.HNSW_PROFILES:
+            raise ValueError(f"Unknown HNSW profile: {hnsw_profile}")
+        
         self._chroma_path = chroma_path or str(Path("data/chroma_db"))
         self._openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         
@@ -59,11 +197,16 @@ class KnowledgeBaseManager:
             raise ValueError("OPENAI_API_KEY not set")
         
         self._openai_client = OpenAI(api_key=self._openai_api_key)
+        self._api_key_id = hashlib.sha256(self._openai_api_key.encode()).hexdigest()[:16]
+        _QUERY_CLIENTS[self._api_key_id] = self._openai_client
         self._chroma_client = chromadb.PersistentClient(path=self._chroma_path)
         self._collection = self._chroma_client.get_or_create_collection(
             name=self.COLLECTION_NAME,
-            metadata={"hnsw:space": "cosine"}
+            metadata={"hnsw:space": "cosine", **self.HNSW_PROFILES[hnsw_profile]}
         )
+        
+        self._sidecar_path = Path(self._chroma_path).parent / self.SIDECAR_DB_FILE
+        self._init_sidecar()
     
     # --- Ingestion ---
     
@@ -100,8 +243,21 @@ class KnowledgeBaseManager:
         text = fetch_result["text"]
         title = fetch_result.get("title") or self._extract_title_from_url(url)
         
-        # Chunk the text
-        chunks = self._chunk_text(text)
+        # Chunk the text (PDF pages are extracted lazily while chunking)
+        try:
+            chunks = self._chunk_text(text)
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Failed to extract content: {e}",
+                "title": title,
+                "chunks_added": 0
+            }
+        
+        # Drop verbatim repeats (boilerplate such as headers and footers)
+        unique_texts = dict.fromkeys(c["text"] for c in chunks)
+        if len(unique_texts) < len(chunks):
+            chunks = [{"text": t, "index": i} for i, t in enumerate(unique_texts)]
         
         if not chunks:
             return {
@@ -114,7 +270,7 @@ class KnowledgeBaseManager:
         # Generate embeddings
         embeddings = self._generate_embeddings([c["text"] for c in chunks])
         
-        if not embeddings:
+        if embeddings is None:
             return {
                 "success": False,
                 "message": "Failed to generate embeddings.",
@@ -123,7 +279,7 @@ class KnowledgeBaseManager:
             }
         
         # Prepare data for ChromaDB
-        url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
+        url_hash = _url_hasher(url.encode()).hexdigest()[:8]
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
         
         ids = [f"kb_{url_hash}_{i}" for i in range(len(chunks))]
@@ -147,6 +303,15 @@ class KnowledgeBaseManager:
             metadatas=metadatas
         )
         
+        try:
+            with self._connect_sidecar() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sources (url, title, chunks) VALUES (?, ?, ?)",
+                    (url, title, len(chunks))
+                )
+        except sqlite3.Error as e:
+            print(f"Sources table error: {e}")
+        
         return {
             "success": True,
             "message": f"Successfully learned '{title}'. Stored {len(chunks)} chunks.",
@@ -175,6 +340,12 @@ class KnowledgeBaseManager:
         ids_to_delete = existing['ids']
         self._collection.delete(ids=ids_to_delete)
         
+        try:
+            with self._connect_sidecar() as conn:
+                conn.execute("DELETE FROM sources WHERE url = ?", (url,))
+        except sqlite3.Error as e:
+            print(f"Sources table error: {e}")
+        
         return {
             "success": True,
             "message": f"Removed {len(ids_to_delete)} chunks from URL.",
@@ -195,12 +366,14 @@ class KnowledgeBaseManager:
             List of dicts with 'text', 'source_url', 'title', 'distance'.
         """
         # Generate query embedding
-        embeddings = self._generate_embeddings([query])
-        if not embeddings:
+        try:
+            query_embedding = _embed_query(self._api_key_id, self.EMBEDDING_MODEL, query)
+        except Exception as e:
+            print(f"Embedding error: {e}")
             return []
         
         results = self._collection.query(
-            query_embeddings=embeddings,
+            query_embeddings=[list(query_embedding)],
             n_results=n_results,
             include=["documents", "metadatas", "distances"]
         )
@@ -219,6 +392,16 @@ class KnowledgeBaseManager:
         
         return output
     
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Get hit/miss counters for the in-process query embedding cache.
+        
+        Returns:
+            Dict with 'hits', 'misses', 'size', 'maxsize'.
+        """
+        info = _embed_query.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+    
     def list_sources(self) -> List[Dict[str, Any]]:
         """
         List all unique sources in the knowledge base.
@@ -226,37 +409,43 @@ class KnowledgeBaseManager:
         Returns:
             List of dicts with 'url', 'title', 'chunks'.
         """
+        try:
+            with self._connect_sidecar() as conn:
+                self._reconcile_sources(conn)
+                rows = conn.execute("SELECT url, title, chunks FROM sources ORDER BY rowid").fetchall()
+            return [{"url": url, "title": title, "chunks": chunks} for url, title, chunks in rows]
+        except sqlite3.Error as e:
+            print(f"Sources table error: {e}")
+            return self._scan_sources()
+    
+    def _scan_sources(self) -> List[Dict[str, Any]]:
+        """Aggregate sources by scanning every chunk's metadata in the collection."""
         all_data = self._collection.get(include=["metadatas"])
         
         if not all_data or not all_data['ids']:
             return []
         
-        sources = {}
+        counts: Counter = Counter()
+        titles: Dict[str, str] = {}
         for meta in all_data['metadatas']:
             url = meta.get("source_url", "Unknown")
-            if url not in sources:
-                sources[url] = {
-                    "url": url,
-                    "title": meta.get("title", "Unknown"),
-                    "chunks": 0
-                }
-            sources[url]["chunks"] += 1
+            counts[url] += 1
+            if url not in titles:
+                titles[url] = meta.get("title", "Unknown")
         
-        return list(sources.values())
+        return [{"url": url, "title": titles[url], "chunks": chunks} for url, chunks in counts.items()]
     
     # --- Private Helpers ---
     
     def _fetch_content(self, url: str) -> Dict[str, Any]:
         """Fetch content from URL, supporting HTML and PDF."""
-        import requests
-        
         try:
-            response = requests.get(url, timeout=30, headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            })
+            response = _HTTP_CLIENT.get(url)
             response.raise_for_status()
-        except requests.RequestException as e:
-            return {"success": False, "error": f"Failed to fetch URL: {e}"}
+        except httpx.HTTPError as e:
+            # httpx appends a multi-line help link to status errors; keep the first line
+            message = str(e).split("\n", 1)[0]
+            return {"success": False, "error": f"Failed to fetch URL: {message}"}
         
         content_type = response.headers.get('content-type', '').lower()
         
@@ -276,19 +465,22 @@ class KnowledgeBaseManager:
         }
     
     def _extract_pdf_text(self, pdf_bytes: bytes) -> Dict[str, Any]:
-        """Extract text from PDF bytes."""
+        """
+        Extract text from PDF bytes.
+        
+        The returned 'text' is an iterator of page texts, so pages are
+        parsed one at a time as _chunk_text consumes them.
+        """
         if not PYPDF_AVAILABLE:
             return {"success": False, "error": "pypdf not installed"}
         
         try:
             reader = PdfReader(io.BytesIO(pdf_bytes))
-            text_parts = []
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text_parts.append(page_text)
+            pages = self._iter_pdf_pages(reader)
             
-            if not text_parts:
+            # Parse up to the first page with text so empty PDFs are reported here
+            first_page = next(pages, None)
+            if first_page is None:
                 return {"success": False, "error": "PDF contains no extractable text"}
             
             # Try to get title from metadata
@@ -298,24 +490,31 @@ class KnowledgeBaseManager:
             
             return {
                 "success": True,
-                "text": "\n\n".join(text_parts),
+                "text": chain([first_page], pages),
                 "title": title
             }
         except Exception as e:
             return {"success": False, "error": f"Failed to parse PDF: {e}"}
     
+    def _iter_pdf_pages(self, reader: "PdfReader") -> Iterator[str]:
+        """Yield the text of each PDF page that has any."""
+        for page in reader.pages:
+            page_text = page.extract_text()
+            if page_text:
+                yield page_text
+    
     def _extract_html_text(self, html: str, url: str) -> Dict[str, Any]:
         """Extract text from HTML."""
         title = None
         
         # Try to extract title
-        title_match = re.search(r'<title[^>]*>([^<]+)</title>', html, re.IGNORECASE)
+        title_match = _RE_TITLE.search(html)
         if title_match:
             title = title_match.group(1).strip()
         
         if BS4_AVAILABLE:
             try:
-                soup = BeautifulSoup(html, 'html.parser')
+                soup = BeautifulSoup(html, HTML_PARSER)
                 
                 # Remove unwanted elements
                 for element in soup(['script', 'style', 'noscript', 'iframe', 'nav', 'footer', 'header']):
@@ -334,69 +533,327 @@ class KnowledgeBaseManager:
                     text = soup.get_text(separator=' ', strip=True)
                 
                 # Clean up whitespace
-                text = re.sub(r'\s+', ' ', text).strip()
+                text = _RE_WS.sub(' ', text).strip()
                 
                 return {"success": True, "text": text, "title": title}
             except Exception:
                 pass
         
         # Fallback: regex-based extraction
-        html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        html = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        text = re.sub(r'<[^>]+>', ' ', html)
-        text = re.sub(r'\s+', ' ', text).strip()
+        html = _RE_SCRIPT.sub('', html)
+        html = _RE_STYLE.sub('', html)
+        text = _RE_TAG.sub(' ', html)
+        text = _RE_WS.sub(' ', text).strip()
         
         return {"success": True, "text": text, "title": title}
     
-    def _chunk_text(self, text: str) -> List[Dict[str, Any]]:
+    def _chunk_text(self, text: Union[str, Iterable[str]]) -> List[Dict[str, Any]]:
         """
         Split text into overlapping chunks.
         
+        Accepts a string or an iterable of text segments (e.g. PDF pages),
+        which are joined with blank lines. Segments are consumed
+        incrementally, keeping only the unchunked tail in memory.
+        
         Returns list of dicts with 'text' and 'index'.
         """
-        if not text:
-            return []
+        segments = [text] if isinstance(text, str) else text
+        chunks: List[Dict[str, Any]] = []
+        buffer = ""
+        
+        for segment in segments:
+            if not segment:
+                continue
+            buffer = f"{buffer}\n\n{segment}" if buffer else segment
+            buffer = self._split_chunks(buffer, chunks, final=False)
+        
+        if buffer:
+            self._split_chunks(buffer, chunks, final=True)
+        return chunks
+    
+    def _split_chunks(self, text: str, chunks: List[Dict[str, Any]], final: bool) -> str:
+        """
+        Append the chunks of text to chunks.
+        
+        Args:
+            text: Text to split.
+            chunks: List to append chunk dicts to.
+            final: Whether no more text follows. If False, the last chunk
+                is held back since following text may extend it.
+            
+        Returns:
+            The unconsumed tail of text (empty when final).
+        """
+        encoding = _get_encoding()
+        if encoding is None:
+            return self._split_chunks_by_chars(text, chunks, final)
+        
+        # Token windows, mapped back to character offsets so chunks are slices of text
+        _, offsets = encoding.decode_with_offsets(encoding.encode_ordinary(text))
+        token_count = len(offsets)
+        
+        # Sentence-end offsets, found in one pass and binary-searched per chunk
+        boundaries = [m.start() for m in _RE_SENTENCE_END.finditer(text)]
+        
+        first = 0
+        while first < token_count:
+            last = first + self.CHUNK_SIZE_TOKENS
+            if last >= token_count and not final:
+                return text[offsets[first]:]
+            
+            start = offsets[first]
+            if last < token_count:
+                end = self._snap_to_sentence(boundaries, start, offsets[last])
+                last = bisect.bisect_left(offsets, end)
+            else:
+                end = len(text)
+            
+            self._append_chunk(text, start, end, chunks)
+            
+            if last >= token_count:
+                break
+            # Move start with overlap
+            first = max(last - self.CHUNK_OVERLAP_TOKENS, first + 1)
         
-        chunks = []
+        return ""
+    
+    def _split_chunks_by_chars(self, text: str, chunks: List[Dict[str, Any]], final: bool) -> str:
+        """Character-window version of _split_chunks, used without the tokenizer."""
         start = 0
         text_len = len(text)
         
+        # Sentence-end offsets, found in one pass and binary-searched per chunk
+        boundaries = [m.start() for m in _RE_SENTENCE_END.finditer(text)]
+        
         while start < text_len:
             end = start + self.CHUNK_SIZE
+            if end >= text_len and not final:
+                return text[start:]
             
             # Try to break at sentence boundary
             if end < text_len:
-                # Look for sentence end within last 100 chars of chunk
-                search_start = max(start, end - 100)
-                last_period = text.rfind('. ', search_start, end)
-                if last_period > start:
-                    end = last_period + 1
+                end = self._snap_to_sentence(boundaries, start, end)
             
-            chunk_text = text[start:end].strip()
-            if chunk_text:
-                chunks.append({
-                    "text": chunk_text,
-                    "index": len(chunks)
-                })
+            self._append_chunk(text, start, end, chunks)
             
             # Move start with overlap
             start = end - self.CHUNK_OVERLAP
             if start >= text_len:
                 break
         
-        return chunks
+        return ""
+    
+    @staticmethod
+    def _append_chunk(text: str, start: int, end: int, chunks: List[Dict[str, Any]]) -> None:
+        """Append text[start:end] with surrounding whitespace trimmed, unless it is blank."""
+        # Trim by index so the chunk is sliced once instead of sliced and stripped
+        end = min(end, len(text))
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            chunks.append({
+                "text": text[start:end],
+                "index": len(chunks)
+            })
     
-    def _generate_embeddings(self, texts: List[str]) -> Optional[List[List[float]]]:
-        """Generate embeddings for a list of texts."""
+    def _snap_to_sentence(self, boundaries: List[int], start: int, end: int) -> int:
+        """Move a chunk end back to a sentence end within its last 100 chars, if any."""
+        search_start = max(start, end - 100)
+        idx = bisect.bisect_left(boundaries, end - 1) - 1
+        if idx >= 0 and boundaries[idx] >= search_start and boundaries[idx] > start:
+            return boundaries[idx] + 1
+        return end
+    
+    def _generate_embeddings(self, texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Generate embeddings for a list of texts.
+        
+        Texts embedded before (by content hash and model) are served from the
+        persistent embedding cache; only the rest are sent to the API.
+        
+        Returns:
+            float32 array of shape (len(texts), dimensions), or None on failure.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        hashes = [hashlib.sha256(text.encode()).hexdigest() for text in texts]
+        
         try:
-            response = self._openai_client.embeddings.create(
-                input=texts,
-                model=self.EMBEDDING_MODEL
+            vectors = self._load_cached_embeddings(hashes)
+        except sqlite3.Error as e:
+            print(f"Embedding cache error: {e}")
+            vectors = {}
+        
+        # One index per distinct uncached text; repeats share its vector
+        first_idx: Dict[str, int] = {}
+        for i, h in enumerate(hashes):
+            first_idx.setdefault(h, i)
+        uncached_idx = [i for h, i in first_idx.items() if h not in vectors]
+        if uncached_idx:
+            try:
+                embeddings = asyncio.run(self._generate_embeddings_async([texts[i] for i in uncached_idx]))
+            except Exception as e:
+                print(f"Embedding error: {e}")
+                return None
+            
+            # Use the quantized form a later cache hit would return, so the same
+            # content is stored in ChromaDB identically whether or not it was cached
+            quantized = {hashes[i]: _quantize_sq8(embedding) for i, embedding in zip(uncached_idx, embeddings)}
+            try:
+                self._store_cached_embeddings(quantized)
+            except sqlite3.Error as e:
+                print(f"Embedding cache error: {e}")
+            vectors.update((h, _dequantize_sq8(scale, blob)) for h, (scale, blob) in quantized.items())
+        
+        return np.stack([vectors[h] for h in hashes])
+    
+    async def _generate_embeddings_async(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts through the API in concurrent sub-batches.
+        
+        Args:
+            texts: Texts to embed.
+            
+        Returns:
+            float32 array of embeddings, one row per text in input order.
+        """
+        batches = self._pack_embedding_batches(texts)
+        semaphore = asyncio.Semaphore(self.EMBEDDING_CONCURRENCY)
+        
+        async with AsyncOpenAI(api_key=self._openai_api_key) as client:
+            async def embed(batch: List[int]) -> Tuple[List[int], Any]:
+                async with semaphore:
+                    response = await client.embeddings.create(
+                        input=[texts[i] for i in batch],
+                        model=self.EMBEDDING_MODEL
+                    )
+                return batch, response
+            
+            results = await asyncio.gather(*(embed(batch) for batch in batches))
+        
+        embeddings: Optional[np.ndarray] = None
+        for batch, response in results:
+            rows = np.asarray([data.embedding for data in response.data], dtype=np.float32)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), rows.shape[1]), dtype=np.float32)
+            embeddings[batch] = rows
+        return embeddings
+    
+    def _pack_embedding_batches(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into request-sized batches by count and token total."""
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i, tokens in enumerate(_count_tokens(texts)):
+            if current and (len(current) >= self.EMBEDDING_BATCH_SIZE or
+                            current_tokens + tokens > self.EMBEDDING_BATCH_TOKENS):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    @contextmanager
+    def _connect_sidecar(self) -> Iterator[sqlite3.Connection]:
+        """Open a connection to the SQLite sidecar, committing on success."""
+        conn = sqlite3.connect(str(self._sidecar_path))
+        conn.execute("PRAGMA busy_timeout = 5000")
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def _init_sidecar(self) -> None:
+        """Create the sidecar tables if needed, reconciling sources with the collection."""
+        self._sidecar_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect_sidecar() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    vec BLOB NOT NULL,
+                    scale REAL,
+                    PRIMARY KEY (hash, model)
+                );
+                
+                CREATE TABLE IF NOT EXISTS sources (
+                    url TEXT PRIMARY KEY,
+                    title TEXT,
+                    chunks INTEGER NOT NULL
+                );
+                """
+            )
+            # Caches created before int8 storage have no scale column (their rows stay float32)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(embedding_cache)")}
+            if "scale" not in columns:
+                conn.execute("ALTER TABLE embedding_cache ADD COLUMN scale REAL")
+            
+            self._reconcile_sources(conn)
+    
+    def _reconcile_sources(self, conn: sqlite3.Connection) -> None:
+        """
+        Rebuild the sources table if it disagrees with the collection.
+        
+        Covers backfilling an existing collection and repairing after a failed
+        sources write by any manager instance; the check is one SUM and a count.
+        """
+        tracked = conn.execute("SELECT COALESCE(SUM(chunks), 0) FROM sources").fetchone()[0]
+        if tracked != self._collection.count():
+            self._rebuild_sources(conn)
+    
+    def _rebuild_sources(self, conn: sqlite3.Connection) -> None:
+        """Replace the sources table with a fresh scan of the collection."""
+        conn.execute("DELETE FROM sources")
+        conn.executemany(
+            "INSERT INTO sources (url, title, chunks) VALUES (?, ?, ?)",
+            [(src["url"], src["title"], src["chunks"]) for src in self._scan_sources()]
+        )
+    
+    def _load_cached_embeddings(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Look up cached vectors for content hashes under the current model."""
+        if not hashes:
+            return {}
+        unique = list(dict.fromkeys(hashes))
+        vectors: Dict[str, np.ndarray] = {}
+        with self._connect_sidecar() as conn:
+            # One IN query per group, kept under SQLite's bound-parameter limit
+            for i in range(0, len(unique), self.CACHE_LOOKUP_BATCH):
+                group = unique[i:i + self.CACHE_LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(group))
+                rows = conn.execute(
+                    f"SELECT hash, scale, vec FROM embedding_cache WHERE model = ? AND hash IN ({placeholders})",
+                    (self.EMBEDDING_MODEL, *group)
+                )
+                vectors.update((h, _dequantize_sq8(scale, vec)) for h, scale, vec in rows)
+        return vectors
+    
+    def _store_cached_embeddings(self, vectors: Dict[str, Tuple[float, bytes]]) -> None:
+        """
+        Write freshly generated vectors to the embedding cache in one transaction.
+        
+        Args:
+            vectors: int8-quantized (scale, blob) pairs by content hash, a
+                quarter of the float32 size.
+        """
+        with self._connect_sidecar() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (hash, model, scale, vec) VALUES (?, ?, ?, ?)",
+                [
+                    (h, self.EMBEDDING_MODEL, scale, blob)
+                    for h, (scale, blob) in vectors.items()
+                ]
             )
-            return [data.embedding for data in response.data]
-        except Exception as e:
-            print(f"Embedding error: {e}")
-            return None
     
     def _extract_title_from_url(self, url: str) -> str:
         """Extract a reasonable title from URL."""
@@ -406,8 +863,8 @@ class KnowledgeBaseManager:
             # Get last path segment
             title = path.split('/')[-1]
             # Remove file extension
-            title = re.sub(r'\.[^.]+$', '', title)
+            title = _RE_EXT.sub('', title)
             # Replace separators with spaces
-            title = re.sub(r'[-_]', ' ', title)
+            title = _RE_SEP.sub(' ', title)
             return title.title() if title else parsed.netloc
         return parsed.netloc
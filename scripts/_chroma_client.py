@@ -0,0 +1,26 @@
+"""
+Shared ChromaDB collection handles for the verification scripts.
+"""
+
+import functools
+
+import chromadb
+
+
+@functools.lru_cache(maxsize=4)
+def get_collection(path: str, name: str, embedding_function=None):
+    """
+    Open a ChromaDB collection once and reuse the handle.
+
+    Args:
+        path: ChromaDB persistence directory
+        name: Collection name
+        embedding_function: Optional embedding function for query_texts
+
+    Returns:
+        The collection (raises if it does not exist)
+    """
+    client = chromadb.PersistentClient(path=path)
+    if embedding_function is None:
+        return client.get_collection(name=name)
+    return client.get_collection(name=name, embedding_function=embedding_function)
@@ -0,0 +1,86 @@
+"""
+On-disk cache of query embeddings for the verification scripts.
+
+Vectors are stored as float32 .npy files keyed by a hash of (model, text),
+so re-running a script with the same fixed queries skips the OpenAI API.
+Loaded vectors are also memoized in-process for repeated queries.
+"""
+
+import functools
+import hashlib
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+CACHE_DIR = Path("data/embed_cache")
+
+
+def _cache_path(text: str, model: str) -> Path:
+    key = hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+    return CACHE_DIR / f"{key}.npy"
+
+
+@functools.lru_cache(maxsize=512)
+def _load_cached(text: str, model: str) -> np.ndarray:
+    """Load a cached vector from disk (raises OSError/ValueError on a miss)."""
+    vector = np.load(_cache_path(text, model))
+    # Shared between callers, so keep it immutable
+    vector.flags.writeable = False
+    return vector
+
+
+def get_embeddings(openai_client, texts: List[str], model: str) -> List[np.ndarray]:
+    """
+    Get embeddings for texts, serving cached vectors from disk.
+
+    Args:
+        openai_client: OpenAI client used for cache misses
+        texts: Texts to embed
+        model: Embedding model name
+
+    Returns:
+        One float32 vector per text, in order
+    """
+    vectors = [None] * len(texts)
+    misses = []
+    for i, text in enumerate(texts):
+        try:
+            vectors[i] = _load_cached(text, model)
+        except (OSError, ValueError):
+            misses.append(i)
+
+    if misses:
+        # Embed all misses in a single request
+        response = openai_client.embeddings.create(
+            input=[texts[i] for i in misses],
+            model=model
+        )
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for i, data in zip(misses, response.data):
+            vectors[i] = np.asarray(data.embedding, dtype=np.float32)
+            np.save(_cache_path(texts[i], model), vectors[i])
+
+    return vectors
+
+
+def get_embedding(openai_client, text: str, model: str) -> np.ndarray:
+    """Get the embedding for a single text, serving it from disk when cached."""
+    return get_embeddings(openai_client, [text], model)[0]
+
+
+class CachedOpenAIEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    ChromaDB embedding function backed by this cache.
+
+    Lets collections take query_texts directly while still serving
+    repeated queries from disk.
+    """
+
+    def __init__(self, openai_client, model: str):
+        self.openai_client = openai_client
+        self.model = model
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return get_embeddings(self.openai_client, list(input), self.model)
@@ -0,0 +1,29 @@
+"""
+Shared OpenAI client for the scripts.
+
+One client per API key, on a keep-alive httpx pool (HTTP/2 when the optional
+h2 package is installed), so repeated requests reuse the connection.
+"""
+
+import functools
+
+import httpx
+from openai import OpenAI
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai_client(api_key: str) -> OpenAI:
+    """Return the shared OpenAI client for api_key."""
+    http_client = httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=4),
+        timeout=30.0
+    )
+    return OpenAI(api_key=api_key, http_client=http_client)
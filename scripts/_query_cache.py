@@ -0,0 +1,66 @@
+"""
+Opt-in on-disk cache of ChromaDB query results for the verification scripts.
+
+Enabled with LOLO_VERIFY_USE_CACHE=1. A hit skips both the embedding and the
+query, so only use it when the collection is known to be unchanged; it is
+off by default so real regressions are not masked.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+CACHE_DIR = Path("data/query_cache")
+ENABLED = os.getenv("LOLO_VERIFY_USE_CACHE") == "1"
+
+
+def _cache_path(
+    collection_name: str,
+    query_text: str,
+    n_results: int,
+    where: Optional[Dict[str, Any]],
+    include: List[str]
+) -> Path:
+    key_data = json.dumps([collection_name, query_text, n_results, where, include], sort_keys=True)
+    return CACHE_DIR / f"{hashlib.sha256(key_data.encode()).hexdigest()}.pkl"
+
+
+def get_cached_query_result(
+    collection_name: str,
+    query_text: str,
+    n_results: int,
+    where: Optional[Dict[str, Any]],
+    include: List[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    Look up stored results for a query.
+
+    Returns:
+        The stored results dict, or None on a miss or when caching is disabled
+    """
+    if not ENABLED:
+        return None
+    try:
+        with open(_cache_path(collection_name, query_text, n_results, where, include), "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def store_query_result(
+    collection_name: str,
+    query_text: str,
+    n_results: int,
+    where: Optional[Dict[str, Any]],
+    include: List[str],
+    results: Dict[str, Any]
+) -> None:
+    """Store results for a query (no-op when caching is disabled)."""
+    if not ENABLED:
+        return
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(_cache_path(collection_name, query_text, n_results, where, include), "wb") as f:
+        pickle.dump(results, f)
@@ -13,6 +13,7 @@ def estimate_cost():
     DB_PATH = Path("data/bot.db")
     MODEL_PRICE_PER_1M_TOKENS = 0.02  # text-embedding-3-small pricing
     ENCODING_NAME = "cl100k_base"
+    BATCH_SIZE = 10_000  # Messages encoded per batch
 
     if not DB_PATH.exists():
         print(f"Error: Database not found at {DB_PATH}")
@@ -27,16 +28,16 @@ def estimate_cost():
         conn.text_factory = lambda b: b.decode(errors="replace")
         cursor = conn.cursor()
         
-        # Get all messages
+        # Count messages
         print("Fetching messages...")
-        cursor.execute("SELECT content FROM messages WHERE content IS NOT NULL AND content != ''")
-        rows = cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) FROM messages WHERE content IS NOT NULL AND content != ''")
+        message_count = cursor.fetchone()[0]
         
-        if not rows:
+        if not message_count:
             print("No messages found in database.")
             return
 
-        print(f"Found {len(rows)} messages. Calculating tokens...")
+        print(f"Found {message_count} messages. Calculating tokens...")
         
         # Initialize tokenizer
         try:
@@ -48,17 +49,21 @@ def estimate_cost():
 
         total_tokens = 0
         
-        for row in rows:
-            content = row[0]
-            # Simple token estimation
-            token_count = len(encoding.encode(content))
-            total_tokens += token_count
+        # Encode in groups across all cores (tiktoken releases the GIL),
+        # reading the rows group by group to cap memory
+        cursor.execute("SELECT content FROM messages WHERE content IS NOT NULL AND content != ''")
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            tokens = encoding.encode_batch([row[0] for row in rows], num_threads=os.cpu_count() or 1)
+            total_tokens += sum(len(t) for t in tokens)
 
         # Calculate cost
         estimated_cost = (total_tokens / 1_000_000) * MODEL_PRICE_PER_1M_TOKENS
         
         print("\n=== Estimation Results ===")
-        print(f"Total Messages: {len(rows)}")
+        print(f"Total Messages: {message_count}")
         print(f"Total Tokens:   {total_tokens:,}")
         print(f"Price per 1M:   ${MODEL_PRICE_PER_1M_TOKENS:.2f}")
         print(f"Estimated Cost: ${estimated_cost:.6f}")
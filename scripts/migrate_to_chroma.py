@@ -4,6 +4,9 @@ import chromadb
 import os
 import time
 import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -11,6 +14,19 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Embedding requests kept in flight while the main thread inserts into ChromaDB
+EMBED_WORKERS = 4
+MAX_PENDING_BATCHES = 8
+# The OpenAI client retries 429/5xx responses with exponential backoff
+# (honouring Retry-After), which replaces a fixed sleep between batches
+OPENAI_MAX_RETRIES = 6
+STATE_DB_FILE = "migration_state.db"
+
+def _save_last_id(state_db, last_id):
+    """Record the highest migrated message ID so the next run can resume from it."""
+    with state_db:
+        state_db.execute("INSERT OR REPLACE INTO state (k, v) VALUES ('last_id', ?)", (last_id,))
+
 def migrate(limit=None, batch_size=100):
     # Configuration
     DB_PATH = Path("data/bot.db")
@@ -28,7 +44,7 @@ def migrate(limit=None, batch_size=100):
         return
 
     # Initialize OpenAI client
-    client = OpenAI(api_key=api_key)
+    client = OpenAI(api_key=api_key, max_retries=OPENAI_MAX_RETRIES)
 
     # Initialize ChromaDB
     print(f"Initializing ChromaDB at {CHROMA_PATH}...")
@@ -38,11 +54,20 @@ def migrate(limit=None, batch_size=100):
         metadata={"hnsw:space": "cosine"}
     )
     
+    # Migration progress lives next to the collection so wiping the ChromaDB
+    # directory also resets it
+    state_db = sqlite3.connect(CHROMA_PATH / STATE_DB_FILE)
+    state_db.execute("CREATE TABLE IF NOT EXISTS state (k TEXT PRIMARY KEY, v INTEGER)")
+
     # Check for existing data to enable incremental updates
     last_id = 0
-    if collection.count() > 0:
+    row = state_db.execute("SELECT v FROM state WHERE k = 'last_id'").fetchone()
+    if row:
+        last_id = row[0]
+        print(f"Resuming migration from message ID {last_id}...")
+    elif collection.count() > 0:
         print("Checking existing data for incremental update...")
-        # Fetch all IDs to find the latest one (efficient enough for <1M records)
+        # No recorded state yet (collection predates it): scan the IDs once
         existing = collection.get(include=[])
         if existing and existing['ids']:
             # Extract IDs from "msg_123" format
@@ -51,6 +76,7 @@ def migrate(limit=None, batch_size=100):
                 valid_ids = [int(x.split('_')[1]) for x in existing['ids'] if x.startswith('msg_') and x.split('_')[1].isdigit()]
                 if valid_ids:
                     last_id = max(valid_ids)
+                    _save_last_id(state_db, last_id)
                     print(f"Found {len(existing['ids'])} existing documents. Last ID: {last_id}")
                     print(f"resuming migration from message ID {last_id}...")
             except Exception as e:
@@ -63,61 +89,25 @@ def migrate(limit=None, batch_size=100):
         cursor = conn.cursor()
         
         # Determine query based on limit and incremental state
-        query = f"SELECT id, timestamp, COALESCE(network, 'libera'), channel, nick, content, is_bot FROM messages WHERE content IS NOT NULL AND content != '' AND id > {last_id}"
+        where = f"WHERE content IS NOT NULL AND content != '' AND id > {last_id}"
+        query = f"SELECT id, timestamp, COALESCE(network, 'libera'), channel, nick, content, is_bot FROM messages {where}"
         if limit:
             query += f" LIMIT {limit}"
             
         print("Fetching new messages from SQLite...")
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        total_messages = conn.execute(f"SELECT COUNT(*) FROM messages {where}").fetchone()[0]
+        if limit:
+            total_messages = min(total_messages, limit)
         
-        if not rows:
+        if not total_messages:
             print("No new messages found to migrate.")
             return
 
-        total_messages = len(rows)
         print(f"Found {total_messages} messages. Starting migration...")
         
-        # Batch processing
-        for i in range(0, total_messages, batch_size):
-            batch = rows[i:i + batch_size]
-            
-            # Prepare data for ChromaDB
-            ids = []
-            documents = []
-            metadatas = []
-            
-            # Prepare batch for embedding
-            texts_to_embed = []
-            
-            for row in batch:
-                msg_id, timestamp, network, channel, nick, content, is_bot = row
-                
-                # Create unique ID for Chroma
-                chroma_id = f"msg_{msg_id}"
-                
-                ids.append(chroma_id)
-                documents.append(content)
-                texts_to_embed.append(content)
-                metadatas.append({
-                    "original_id": msg_id,
-                    "timestamp": timestamp,
-                    "timestamp_unix": int(time.mktime(time.strptime(timestamp[:19], "%Y-%m-%d %H:%M:%S"))) if timestamp else 0,
-                    "network": network or "libera",
-                    "channel": channel if channel else "PM",
-                    "nick": nick,
-                    "is_bot": bool(is_bot)
-                })
-
+        def store_batch(start, ids, documents, metadatas, embed_future):
             try:
-                # Generate embeddings
-                # Note: ChromaDB client can handle embedding generation automatically if configured,
-                # but we'll do it manually to ensure we use the specific model and key we want.
-                response = client.embeddings.create(
-                    input=texts_to_embed,
-                    model=MODEL_NAME
-                )
-                
+                response = embed_future.result()
                 embeddings = [data.embedding for data in response.data]
                 
                 # Add to ChromaDB
@@ -127,17 +117,59 @@ def migrate(limit=None, batch_size=100):
                     metadatas=metadatas,
                     documents=documents
                 )
+                _save_last_id(state_db, max(m["original_id"] for m in metadatas))
                 
-                print(f"Processed {min(i + batch_size, total_messages)}/{total_messages} messages...")
+                print(f"Processed {min(start + batch_size, total_messages)}/{total_messages} messages...")
                 
             except Exception as e:
-                print(f"Error processing batch starting at index {i}: {e}")
-                # Optional: break or continue based on preference. 
-                # For now we'll continue to try the next batch.
-                continue
+                print(f"Error processing batch starting at index {start}: {e}")
+                # Continue with the next batch
+
+        # Batch processing, streaming rows from the cursor one batch at a time.
+        # Embedding calls are submitted ahead to a thread pool so network I/O
+        # overlaps with the HNSW inserts done here on the main thread.
+        cursor.execute(query)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as pool:
+            for i in itertools.count(0, batch_size):
+                batch = list(itertools.islice(cursor, batch_size))
+                if not batch:
+                    break
+                
+                # Prepare data for ChromaDB
+                ids = []
+                documents = []
+                metadatas = []
                 
-            # Sleep briefly to avoid rate limits
-            time.sleep(0.5)
+                for row in batch:
+                    msg_id, timestamp, network, channel, nick, content, is_bot = row
+                    
+                    # Create unique ID for Chroma
+                    chroma_id = f"msg_{msg_id}"
+                    
+                    ids.append(chroma_id)
+                    documents.append(content)
+                    metadatas.append({
+                        "original_id": msg_id,
+                        "timestamp": timestamp,
+                        "timestamp_unix": int(time.mktime(time.strptime(timestamp[:19], "%Y-%m-%d %H:%M:%S"))) if timestamp else 0,
+                        "network": network or "libera",
+                        "channel": channel if channel else "PM",
+                        "nick": nick,
+                        "is_bot": bool(is_bot)
+                    })
+
+                # Generate embeddings
+                # Note: ChromaDB client can handle embedding generation automatically if configured,
+                # but we'll do it manually to ensure we use the specific model and key we want.
+                embed_future = pool.submit(client.embeddings.create, input=documents, model=MODEL_NAME)
+                pending.append((i, ids, documents, metadatas, embed_future))
+                
+                if len(pending) >= MAX_PENDING_BATCHES:
+                    store_batch(*pending.popleft())
+            
+            while pending:
+                store_batch(*pending.popleft())
             
         print("\nMigration complete!")
         print(f"Total documents in collection: {collection.count()}")
@@ -147,6 +179,7 @@ def migrate(limit=None, batch_size=100):
     finally:
         if 'conn' in locals():
             conn.close()
+        state_db.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Migrate chat history to ChromaDB")
@@ -1,18 +1,185 @@
 
-import chromadb
+import asyncio
+import io
+import numpy as np
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Load environment variables
 load_dotenv()
 
+# Add project root to path so we can import the shared script helpers
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from scripts._chroma_client import get_collection
+from scripts._embed_cache import get_embeddings
+from scripts._openai_client import get_openai_client
+from scripts._query_cache import get_cached_query_result, store_query_result
+
+# Aho-Corasick finds all keywords in one pass over a document
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+def keyword_matcher(keywords):
+    """
+    Build a keyword matcher for lowercased documents.
+
+    Returns:
+        Function mapping a list of documents to the keywords found in each
+    """
+    if not AHOCORASICK_AVAILABLE:
+        def match_all(docs_lower):
+            # (keywords x documents) hit matrix, searched in C by np.char
+            docs = np.array(docs_lower, dtype=str)
+            matrix = np.vstack([np.char.find(docs, kw) >= 0 for kw in keywords])
+            return [[kw for kw, hit in zip(keywords, column) if hit] for column in matrix.T]
+        return match_all
+
+    automaton = ahocorasick.Automaton()
+    for kw in keywords:
+        automaton.add_word(kw, kw)
+    automaton.make_automaton()
+
+    def match(doc_lower):
+        found = {kw for _, kw in automaton.iter(doc_lower)}
+        return [kw for kw in keywords if kw in found]
+    return lambda docs_lower: [match(doc_lower) for doc_lower in docs_lower]
+
+async def query_all(collection, all_query_params):
+    """Run ChromaDB queries concurrently in worker threads (the client is sync)."""
+    return await asyncio.gather(*(
+        asyncio.to_thread(collection.query, **query_params)
+        for query_params in all_query_params
+    ))
+
+RELEVANCE_THRESHOLD = 0.55  # Messages with distance < this are considered relevant
+
+# Report markers
+RELEVANT_MARK = "✅ RELEVANT"
+WEAK_MARK = "⚠️  WEAK"
+PASS_MARK = "✅ PASS"
+FAIL_MARK = "❌ FAIL"
+
+# One result row of the report, filled in per row with format_map
+ROW_TMPL = (
+    "{i}. [{timestamp}] {nick}\n"
+    "   Dist: {distance:.4f} {relevance_mark} {keyword_mark}\n"
+    "   > {doc:.120}{ellipsis}\n"
+    "\n"
+).format_map
+
+# IRC-style queries that users would actually ask
+TESTS = [
+    {
+        "query": "what did mathisen say about cats?",
+        "keywords": ["cat", "kitten", "feline"],
+        "expected_user": "Mathisen",
+        "description": "User-specific query (Mathisen's cat discussions)",
+        "context": "User wants to recall what Mathisen said about cats"
+    },
+    {
+        "query": "when did de-facto talk about upgrading bella?",
+        "keywords": ["upgrade", "bella", "brain", "update"],
+        "expected_user": "de-facto",
+        "description": "Event recall with user filter (de-facto + bella upgrade)",
+        "context": "User wants to know when de-facto mentioned upgrading bella"
+    },
+    {
+        "query": "xml parsing issues discussed in the channel",
+        "keywords": ["xml", "parse", "cdata", "xslt", "valid"],
+        "expected_user": None,  # Any user
+        "description": "Technical topic search (XML parsing)",
+        "context": "User wants to find technical discussions about XML"
+    }
+]
+
+def evaluate_test(idx, test, results, n_results):
+    """
+    Score one test's query results and render its report.
+
+    Returns:
+        (passed, report) where report is the test's full printed output
+    """
+    buf = io.StringIO()
+    print(f"{'='*80}", file=buf)
+    print(f"Test {idx}: {test['description']}", file=buf)
+    print(f"{'='*80}", file=buf)
+    print(f"IRC Query: '{test['query']}'", file=buf)
+    print(f"Context: {test['context']}", file=buf)
+    print(f"Looking for keywords: {', '.join(test['keywords'])}", file=buf)
+    if test['expected_user']:
+        print(f"Filtering for user: {test['expected_user']}", file=buf)
+    print(file=buf)
+
+    match_keywords = keyword_matcher(test['keywords'])
+
+    docs, metas = results['documents'][0], results['metadatas'][0]
+
+    # Evaluate results (distances unboxed once into a float32 array)
+    distances = np.fromiter(results['distances'][0], dtype=np.float32, count=len(docs))
+    relevant_mask = distances < RELEVANCE_THRESHOLD
+    relevant_count = int(relevant_mask.sum())
+
+    print("Top Results:", file=buf)
+    print("-" * 80, file=buf)
+
+    # Lowercase every document once for keyword matching
+    docs_lower = [doc.lower() for doc in docs]
+    matched_per_doc = match_keywords(docs_lower)
+    keyword_matches = sum(1 for matched in matched_per_doc if matched)
+
+    for i, doc in enumerate(docs):
+        meta = metas[i]
+        distance = distances[i]
+
+        timestamp = meta.get('timestamp', 'Unknown')[:19]
+        nick = meta.get('nick', 'Unknown')
+
+        is_relevant = relevant_mask[i]
+
+        matched_keywords = matched_per_doc[i]
+
+        # Visual indicators
+        relevance_mark = RELEVANT_MARK if is_relevant else WEAK_MARK
+        keyword_mark = f"[Keywords: {', '.join(matched_keywords)}]" if matched_keywords else ""
+
+        buf.write(ROW_TMPL({
+            "i": i + 1,
+            "timestamp": timestamp,
+            "nick": nick,
+            "distance": distance,
+            "relevance_mark": relevance_mark,
+            "keyword_mark": keyword_mark,
+            "doc": doc,
+            "ellipsis": "..." if len(doc) > 120 else ""
+        }))
+
+    # Determine test success
+    # Pass if we have at least 3 relevant results OR at least 2 with keyword matches
+    passed = (relevant_count >= 3) or (keyword_matches >= 2)
+
+    print("-" * 80, file=buf)
+    print(f"Results Summary:", file=buf)
+    print(f"  • Relevant matches (dist < {RELEVANCE_THRESHOLD}): {relevant_count}/{n_results}", file=buf)
+    print(f"  • Keyword matches: {keyword_matches}/{n_results}", file=buf)
+    print(f"  • Test Status: {PASS_MARK if passed else FAIL_MARK}", file=buf)
+
+    print(file=buf)
+    return passed, buf.getvalue()
+
 def run_test():
     CHROMA_PATH = Path("data/chroma_db")
     COLLECTION_NAME = "chat_history"
     MODEL_NAME = "text-embedding-3-small"
-    RELEVANCE_THRESHOLD = 0.55  # Messages with distance < this are considered relevant
+    # The pass criteria only look at the top 8; DETAILED=1 shows more for debugging
+    N_RESULTS = 20 if os.getenv("DETAILED") == "1" else 8
+    INCLUDE = ['documents', 'metadatas', 'distances']
     
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
@@ -20,129 +187,68 @@ def run_test():
         return
 
     print(f"Connecting to ChromaDB at {CHROMA_PATH}...")
-    client = chromadb.PersistentClient(path=str(CHROMA_PATH))
-    collection = client.get_collection(name=COLLECTION_NAME)
-    openai_client = OpenAI(api_key=api_key)
-
-    # IRC-style queries that users would actually ask
-    tests = [
-        {
-            "query": "what did mathisen say about cats?",
-            "keywords": ["cat", "kitten", "feline"],
-            "expected_user": "Mathisen",
-            "description": "User-specific query (Mathisen's cat discussions)",
-            "context": "User wants to recall what Mathisen said about cats"
-        },
-        {
-            "query": "when did de-facto talk about upgrading bella?",
-            "keywords": ["upgrade", "bella", "brain", "update"],
-            "expected_user": "de-facto",
-            "description": "Event recall with user filter (de-facto + bella upgrade)",
-            "context": "User wants to know when de-facto mentioned upgrading bella"
-        },
-        {
-            "query": "xml parsing issues discussed in the channel",
-            "keywords": ["xml", "parse", "cdata", "xslt", "valid"],
-            "expected_user": None,  # Any user
-            "description": "Technical topic search (XML parsing)",
-            "context": "User wants to find technical discussions about XML"
-        }
-    ]
+    collection = get_collection(str(CHROMA_PATH), COLLECTION_NAME)
+    openai_client = get_openai_client(api_key)
 
-    print(f"\nRunning {len(tests)} IRC-style semantic search tests...")
+    print(f"\nRunning {len(TESTS)} IRC-style semantic search tests...")
     print(f"Relevance threshold: {RELEVANCE_THRESHOLD} (lower distance = more relevant)\n")
 
-    total_passed = 0
-    
-    for idx, test in enumerate(tests, 1):
-        print(f"{'='*80}")
-        print(f"Test {idx}: {test['description']}")
-        print(f"{'='*80}")
-        print(f"IRC Query: '{test['query']}'")
-        print(f"Context: {test['context']}")
-        print(f"Looking for keywords: {', '.join(test['keywords'])}")
-        if test['expected_user']:
-            print(f"Filtering for user: {test['expected_user']}")
-        print()
-        
-        # Generate embedding
-        response = openai_client.embeddings.create(
-            input=test['query'],
-            model=MODEL_NAME
-        )
-        query_embedding = response.data[0].embedding
-        
-        # Query ChromaDB with optional user filter
-        query_params = {
-            "query_embeddings": [query_embedding],
-            "n_results": 20,
-            "include": ['documents', 'metadatas', 'distances']
-        }
-        
-        # Add metadata filter if user is specified
-        if test['expected_user']:
-            query_params["where"] = {"nick": test['expected_user']}
-        
-        results = collection.query(**query_params)
-        
-        # Evaluate results
-        relevant_count = 0
-        keyword_matches = 0
-        
-        print("Top Results:")
-        print("-" * 80)
+    # With LOLO_VERIFY_USE_CACHE=1, stored results are reused for unchanged queries
+    wheres = [{"nick": test['expected_user']} if test['expected_user'] else None for test in TESTS]
+    all_results = [
+        get_cached_query_result(COLLECTION_NAME, test['query'], N_RESULTS, where, INCLUDE)
+        for test, where in zip(TESTS, wheres)
+    ]
+    pending = [i for i, results in enumerate(all_results) if results is None]
+
+    if pending:
+        # Embed every remaining query in a single request (cached on disk across runs)
+        embeddings = dict(zip(pending, get_embeddings(openai_client, [TESTS[i]['query'] for i in pending], MODEL_NAME)))
+
+        # Tests sharing a user filter go into one multi-embedding query, and
+        # the per-filter queries run concurrently
+        groups = {}
+        for i in pending:
+            groups.setdefault(TESTS[i]['expected_user'], []).append(i)
         
-        for i, doc in enumerate(results['documents'][0]):
-            meta = results['metadatas'][0][i]
-            distance = results['distances'][0][i]
-            
-            timestamp = meta.get('timestamp', 'Unknown')[:19]
-            nick = meta.get('nick', 'Unknown')
-            
-            # Check relevance
-            is_relevant = distance < RELEVANCE_THRESHOLD
-            if is_relevant:
-                relevant_count += 1
-            
-            # Check keyword matches
-            doc_lower = doc.lower()
-            matched_keywords = [kw for kw in test['keywords'] if kw in doc_lower]
-            if matched_keywords:
-                keyword_matches += 1
+        all_query_params = []
+        for user, indices in groups.items():
+            query_params = {
+                "query_embeddings": [embeddings[i] for i in indices],
+                "n_results": N_RESULTS,
+                "include": INCLUDE
+            }
             
-            # Visual indicators
-            relevance_mark = "✅ RELEVANT" if is_relevant else "⚠️  WEAK"
-            keyword_mark = f"[Keywords: {', '.join(matched_keywords)}]" if matched_keywords else ""
-            
-            print(f"{i+1}. [{timestamp}] {nick}")
-            print(f"   Dist: {distance:.4f} {relevance_mark} {keyword_mark}")
-            print(f"   > {doc[:120]}{'...' if len(doc) > 120 else ''}")
-            print()
-
-        # Determine test success
-        # Pass if we have at least 3 relevant results OR at least 2 with keyword matches
-        passed = (relevant_count >= 3) or (keyword_matches >= 2)
-        
-        print("-" * 80)
-        print(f"Results Summary:")
-        print(f"  • Relevant matches (dist < {RELEVANCE_THRESHOLD}): {relevant_count}/8")
-        print(f"  • Keyword matches: {keyword_matches}/8")
-        print(f"  • Test Status: {'✅ PASS' if passed else '❌ FAIL'}")
+            # Add metadata filter if user is specified
+            if user:
+                query_params["where"] = {"nick": user}
+            all_query_params.append(query_params)
         
+        # Split each group's results back out per test
+        group_results = asyncio.run(query_all(collection, all_query_params))
+        for indices, results in zip(groups.values(), group_results):
+            for row, i in enumerate(indices):
+                all_results[i] = {field: [results[field][row]] for field in INCLUDE}
+                store_query_result(COLLECTION_NAME, TESTS[i]['query'], N_RESULTS, wheres[i], INCLUDE, all_results[i])
+
+    total_passed = 0
+    
+    for idx, test in enumerate(TESTS, 1):
+        passed, report = evaluate_test(idx, test, all_results[idx - 1], N_RESULTS)
+        # Each test's report is written out in one call
+        sys.stdout.write(report)
         if passed:
             total_passed += 1
-        
-        print()
 
     # Final summary
     print(f"{'='*80}")
-    print(f"FINAL RESULTS: {total_passed}/{len(tests)} tests passed")
+    print(f"FINAL RESULTS: {total_passed}/{len(TESTS)} tests passed")
     print(f"{'='*80}")
     
-    if total_passed == len(tests):
+    if total_passed == len(TESTS):
         print("🎉 All tests passed! Semantic search is working well.")
     else:
-        print(f"⚠️  {len(tests) - total_passed} test(s) need improvement.")
+        print(f"⚠️  {len(TESTS) - total_passed} test(s) need improvement.")
             
 if __name__ == "__main__":
     run_test()
@@ -1,13 +1,21 @@
 
-import chromadb
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Load environment variables
 load_dotenv()
 
+# Add project root to path so we can import the shared script helpers
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from scripts._chroma_client import get_collection
+from scripts._embed_cache import CachedOpenAIEmbeddingFunction
+from scripts._openai_client import get_openai_client
+from scripts._query_cache import get_cached_query_result, store_query_result
+
 def verify():
     CHROMA_PATH = Path("data/chroma_db")
     COLLECTION_NAME = "chat_history"
@@ -22,11 +30,13 @@ def verify():
         print(f"Error: ChromaDB not found at {CHROMA_PATH}")
         return
 
+    # Initialize OpenAI for embedding generation
+    openai_client = get_openai_client(api_key)
+    embedding_function = CachedOpenAIEmbeddingFunction(openai_client, MODEL_NAME)
+
     print(f"Connecting to ChromaDB at {CHROMA_PATH}...")
-    client = chromadb.PersistentClient(path=str(CHROMA_PATH))
-    
     try:
-        collection = client.get_collection(name=COLLECTION_NAME)
+        collection = get_collection(str(CHROMA_PATH), COLLECTION_NAME, embedding_function)
         count = collection.count()
         print(f"Collection '{COLLECTION_NAME}' contains {count} documents.")
         
@@ -34,27 +44,25 @@ def verify():
             print("Collection is empty!")
             return
 
-        # Initialize OpenAI for embedding generation
-        openai_client = OpenAI(api_key=api_key)
-
         # Test Query 1: Semantic Search
         query_text = "russian"
         print(f"\n--- Test Query: '{query_text}' ---")
         
-        # Generate embedding for query
-        response = openai_client.embeddings.create(
-            input=query_text,
-            model=MODEL_NAME
-        )
-        query_embedding = response.data[0].embedding
-        
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=3
-        )
+        # With LOLO_VERIFY_USE_CACHE=1, stored results are reused for unchanged queries
+        include = ['documents', 'metadatas']
+        results = get_cached_query_result(COLLECTION_NAME, query_text, 3, None, include)
+        if results is None:
+            # The collection embeds the query itself (cached on disk across runs)
+            results = collection.query(
+                query_texts=[query_text],
+                n_results=3,
+                include=include
+            )
+            store_query_result(COLLECTION_NAME, query_text, 3, None, include, results)
         
-        for i, doc in enumerate(results['documents'][0]):
-            meta = results['metadatas'][0][i]
+        docs, metas = results['documents'][0], results['metadatas'][0]
+        for i, doc in enumerate(docs):
+            meta = metas[i]
             print(f"\nResult {i+1}:")
             print(f"Content: {doc}")
             print(f"Metadata: {meta}")
@@ -62,9 +70,11 @@ def verify():
         # Test Query 2: Metadata Filtering
         print(f"\n--- Test Query: Metadata Filter (is_bot=true) ---")
         # Just getting the last inserted bot message essentially, or random
+        # Pin include so embeddings are never fetched for this check
         results = collection.get(
             where={"is_bot": True},
-            limit=3
+            limit=3,
+            include=['documents', 'metadatas']
         )
         
         # collection.get returns dictionaries with 'ids', 'embeddings', 'metadatas', 'documents'